@@ -5,4 +5,104 @@ load_dotenv()
 
 class MongoConfig:
     MONGO_URI = os.getenv("MONGO_URI")
-    MONGO_DB_NAME= os.getenv("MONGO_DB_NAME")
\ No newline at end of file
+    MONGO_DB_NAME= os.getenv("MONGO_DB_NAME")
+
+class EmbeddingConfig:
+    # stored face embeddings: "float32" or "float16"
+    DTYPE = os.getenv("EMBEDDING_DTYPE", "float32")
+
+class FaceIndexConfig:
+    # "exact" always scans the whole gallery, "ivf" switches to the clustered index for large galleries
+    BACKEND = os.getenv("FACE_INDEX_BACKEND", "ivf")
+    MIN_SIZE = int(os.getenv("FACE_INDEX_MIN_SIZE", 5000))
+    NLIST = int(os.getenv("FACE_INDEX_NLIST", 0))  # 0 = sqrt(gallery size)
+    NPROBE = int(os.getenv("FACE_INDEX_NPROBE", 8))
+    RERANK = int(os.getenv("FACE_INDEX_RERANK", 32))
+    COARSE_DIM = int(os.getenv("FACE_INDEX_COARSE_DIM", 128))  # 0 = no projection
+    KMEANS_ITERS = int(os.getenv("FACE_INDEX_KMEANS_ITERS", 10))
+    TRAIN_SAMPLE = int(os.getenv("FACE_INDEX_TRAIN_SAMPLE", 20000))
+
+class InferenceConfig:
+    # "thread" or "process"; processes sidestep the GIL but each loads its own models
+    MODE = os.getenv("INFERENCE_MODE", "thread")
+    WORKERS = int(os.getenv("INFERENCE_WORKERS", 2))
+    MAX_QUEUE = int(os.getenv("INFERENCE_MAX_QUEUE", 16))
+    TIMEOUT = float(os.getenv("INFERENCE_TIMEOUT", 30))
+
+class PPEModelConfig:
+    PATH = os.getenv("PPE_MODEL_PATH", "backend/routes/best.pt")
+    # "pytorch" loads PATH directly, "onnx" / "openvino" load the export sitting next to it
+    BACKEND = os.getenv("PPE_MODEL_BACKEND", "pytorch")
+    INT8 = os.getenv("PPE_MODEL_INT8", "false").lower() == "true"
+    CONF = float(os.getenv("PPE_MODEL_CONF", 0.25))
+    # frames from concurrent sessions are grouped into one forward pass
+    MAX_BATCH = int(os.getenv("PPE_MAX_BATCH", 8))
+    MAX_WAIT_MS = float(os.getenv("PPE_MAX_WAIT_MS", 5))
+    # frames are downscaled so their longest side is at most MAX_SIDE before inference
+    MAX_SIDE = int(os.getenv("PPE_MAX_SIDE", 640))
+    # after a person is found, later rounds run on a padded crop around them until
+    # the person box overlaps its previous position by less than ROI_MIN_IOU
+    ROI_ENABLED = os.getenv("PPE_ROI_ENABLED", "true").lower() == "true"
+    ROI_PAD = float(os.getenv("PPE_ROI_PAD", 0.2))
+    ROI_MIN_IOU = float(os.getenv("PPE_ROI_MIN_IOU", 0.6))
+
+class SessionConfig:
+    # "redis" for multi-worker deployments, "memory" for single-process single-node sites
+    BACKEND = os.getenv("SESSION_BACKEND", "redis")
+    MAX_SESSIONS = int(os.getenv("SESSION_MAX_SESSIONS", 10000))
+    REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+    TTL = int(os.getenv("SESSION_TTL", 60 * 5))
+
+class FrameCacheConfig:
+    # near-identical frames (perceptual hash within MAX_DISTANCE bits) reuse the previous result
+    ENABLED = os.getenv("FRAME_CACHE_ENABLED", "true").lower() == "true"
+    MAX_DISTANCE = int(os.getenv("FRAME_CACHE_MAX_DISTANCE", 4))
+    TTL = float(os.getenv("FRAME_CACHE_TTL", 10))
+    MAX_ENTRIES = int(os.getenv("FRAME_CACHE_MAX_ENTRIES", 1000))
+
+class WriteConfig:
+    # when true finalize writes go through the batched background writer and the
+    # gate response doesn't wait for them to reach Mongo: a crash before the drain
+    # loses them, and end_detect only flushes its own worker's queue
+    WRITE_BEHIND = os.getenv("PPE_WRITE_BEHIND", "false").lower() == "true"
+    MAX_BATCH = int(os.getenv("WRITE_MAX_BATCH", "200"))
+    MAX_WAIT_MS = float(os.getenv("WRITE_MAX_WAIT_MS", "50"))
+    MAX_QUEUE = int(os.getenv("WRITE_MAX_QUEUE", "5000"))
+
+class AuditConfig:
+    SAMPLE_FPS = float(os.getenv("AUDIT_SAMPLE_FPS", "2"))
+    WINDOW_SEC = float(os.getenv("AUDIT_WINDOW_SEC", "60"))
+    BATCH = int(os.getenv("AUDIT_BATCH", "8"))
+    # a batch turned away by a busy gate scheduler (429) or inference queue (503) is retried
+    MAX_RETRIES = int(os.getenv("AUDIT_MAX_RETRIES", "30"))
+    RETRY_MAX_WAIT = float(os.getenv("AUDIT_RETRY_MAX_WAIT", "30"))  # seconds
+
+class SchedulerConfig:
+    KEY = os.getenv("SCHEDULER_KEY", "camera")  # camera | company
+    MAX_IN_FLIGHT = int(os.getenv("SCHEDULER_MAX_IN_FLIGHT", "8"))
+    MAX_QUEUE = int(os.getenv("SCHEDULER_MAX_QUEUE", "4"))  # waiting requests per camera/company
+    WEIGHTS = os.getenv("SCHEDULER_WEIGHTS", "")  # e.g. "companyA:3,companyB:1"
+    RETRY_AFTER = float(os.getenv("SCHEDULER_RETRY_AFTER", "1"))
+
+class WarmupConfig:
+    # load and exercise the models in every inference worker right after startup
+    ENABLED = os.getenv("MODEL_WARMUP", "true").lower() == "true"
+    TIMEOUT = float(os.getenv("MODEL_WARMUP_TIMEOUT", "300"))
+
+class DashboardCacheConfig:
+    ENABLED = os.getenv("DASHBOARD_CACHE", "true").lower() == "true"
+    # where invalidation versions live: "redis" shares them across workers, so a write
+    # on one worker invalidates every worker's copy; "memory" only suits a single process
+    VERSIONS = os.getenv("DASHBOARD_CACHE_VERSIONS", SessionConfig.BACKEND)
+    TTL = float(os.getenv("DASHBOARD_CACHE_TTL", "60"))  # seconds
+    MAX_ENTRIES = int(os.getenv("DASHBOARD_CACHE_MAX_ENTRIES", "500"))
+
+class IndexConfig:
+    # create/verify collection indexes in the background at startup
+    ENSURE_ON_STARTUP = os.getenv("ENSURE_INDEXES", "true").lower() == "true"
+
+class GalleryConfig:
+    # invalidation versions for the per-company face galleries, shared across workers with "redis"
+    VERSIONS = os.getenv("GALLERY_VERSIONS", SessionConfig.BACKEND)
+    # upper bound on how long a gallery is reused, even if its version can't be checked
+    TTL = float(os.getenv("GALLERY_TTL", 300))  # seconds
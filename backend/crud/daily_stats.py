@@ -0,0 +1,183 @@
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+from pymongo import ReplaceOne, UpdateOne
+from backend.db import db
+
+daily_stats_col = db["daily_stats"]
+attendance_col = db["attendance"]
+ppe_col = db["ppe_records"]
+
+PPE_ITEMS = ["helmet", "vest", "gloves", "goggles", "ear protection"]
+
+# Rollup documents, one per (company, day) and one per (employee, day):
+#   {_id, scope: "company"|"employee", company_id, [employee_email], day: "YYYY-MM-DD",
+#    present, absent,                      # attendance rows
+#    records, checked,                     # ppe_records / those with a non-empty ppe_result
+#    fully, partial, non,                  # compliance of the checked records
+#    violations: {item: n}, points,
+#    employee only: missed, worn: {item: n}, non_compliant, non_compliant_missed, first_check}
+# Counters are only ever $inc'ed, so concurrent writers never lose updates.
+
+
+def company_key(company_id: str, day: str) -> dict:
+    return {"_id": f"{company_id}|{day}", "scope": "company", "company_id": company_id, "day": day}
+
+
+def employee_key(company_id: str, email: str, day: str) -> dict:
+    return {"_id": f"{company_id}|{day}|{email}", "scope": "employee", "company_id": company_id,
+            "employee_email": email, "day": day}
+
+
+# ----------------------------
+# Deltas for one raw write: (key, $inc fields, $min fields)
+# ----------------------------
+def ppe_deltas(record: dict) -> list:
+    ppe = record.get("ppe_result") or {}
+    day = record["timestamp"].date().isoformat()
+    common = {"records": 1, "points": record.get("today_points") or 0}
+    company, employee = dict(common), dict(common)
+    minimums = {}
+
+    if ppe:
+        missed = len(PPE_ITEMS) - sum(1 for item, val in ppe.items() if item != "person" and val)
+        compliance = "fully" if missed == 0 else "partial" if 1 <= missed <= 2 else "non"
+        for inc in (company, employee):
+            inc["checked"] = 1
+            inc[compliance] = 1
+            for item in PPE_ITEMS:
+                if item in ppe and not ppe[item]:
+                    inc[f"violations.{item}"] = 1
+        employee["missed"] = missed
+        for item in PPE_ITEMS:
+            if ppe.get(item):
+                employee[f"worn.{item}"] = 1
+        minimums["first_check"] = record["timestamp"]
+
+    # the company dashboard ranks by the compliance_status saved with the record
+    if record.get("compliance_status") == "non":
+        employee["non_compliant"] = 1
+        employee["non_compliant_missed"] = sum(1 for item, val in ppe.items() if item != "person" and not val)
+
+    deltas = [(company_key(record["company_id"], day), company, {})]
+    if record.get("employee_email"):
+        deltas.append((employee_key(record["company_id"], record["employee_email"], day), employee, minimums))
+    return deltas
+
+
+def attendance_deltas(company_id: str, email: str, day: str, present: bool) -> list:
+    inc = {"present": 1} if present else {"absent": 1}
+    deltas = [(company_key(company_id, day), inc, {})]
+    if email:
+        deltas.append((employee_key(company_id, email, day), dict(inc), {}))
+    return deltas
+
+
+def to_ops(deltas: Iterable) -> List[UpdateOne]:
+    ops = []
+    for key, inc, minimums in deltas:
+        update = {"$inc": inc, "$setOnInsert": {k: v for k, v in key.items() if k != "_id"}}
+        if minimums:
+            update["$min"] = minimums
+        ops.append(UpdateOne({"_id": key["_id"]}, update, upsert=True))
+    return ops
+
+
+def ppe_rollup_ops(record: dict) -> List[UpdateOne]:
+    return to_ops(ppe_deltas(record))
+
+
+def attendance_rollup_ops(company_id: str, email: str, day: str, present: bool) -> List[UpdateOne]:
+    return to_ops(attendance_deltas(company_id, email, day, present))
+
+
+async def apply_rollup(ops: List[UpdateOne]):
+    if ops:
+        await daily_stats_col.bulk_write(ops, ordered=False)
+
+
+# ----------------------------
+# Reads
+# ----------------------------
+async def company_days(company_id: str, start: date, end: date) -> Dict[str, dict]:
+    cursor = daily_stats_col.find({
+        "scope": "company",
+        "company_id": company_id,
+        "day": {"$gte": start.isoformat(), "$lte": end.isoformat()},
+    })
+    return {doc["day"]: doc async for doc in cursor}
+
+
+async def employee_days(start: date, end: date, company_id: Optional[str] = None,
+                        email: Optional[str] = None) -> List[dict]:
+    query = {"scope": "employee", "day": {"$gte": start.isoformat(), "$lte": end.isoformat()}}
+    if company_id is not None:
+        query["company_id"] = company_id
+    if email is not None:
+        query["employee_email"] = email
+    return await daily_stats_col.find(query).sort("day", 1).to_list(length=None)
+
+
+# ----------------------------
+# Backfill / rebuild from the raw collections
+# ----------------------------
+def _nest(flat: dict) -> dict:
+    doc = {}
+    for field, value in flat.items():
+        parent, _, child = field.partition(".")
+        if child:
+            doc.setdefault(parent, {})[child] = value
+        else:
+            doc[field] = value
+    return doc
+
+
+async def rebuild_daily_stats(company_id: Optional[str] = None, since: Optional[date] = None,
+                              include_today: bool = False, batch_size: int = 1000) -> int:
+    """
+    Recompute the rollup for one company (or all) from `since` (or the beginning);
+    returns docs written. Only closed days are rebuilt: today's docs are still
+    being $inc'ed by live writers, so they are left alone. `include_today` lifts
+    that and is only safe with no writers running (offline backfill, benches, tests).
+    """
+    until = date.today() + timedelta(days=1) if include_today else date.today()
+    docs: Dict[str, dict] = {}
+    counters = defaultdict(lambda: defaultdict(int))
+
+    def fold(deltas):
+        for key, inc, minimums in deltas:
+            docs.setdefault(key["_id"], dict(key))
+            for field, value in inc.items():
+                counters[key["_id"]][field] += value
+            for field, value in minimums.items():
+                current = docs[key["_id"]].get(field)
+                docs[key["_id"]][field] = value if current is None else min(current, value)
+
+    attendance_query = {"attendance_date": {"$lt": until.isoformat()}}
+    ppe_query = {"timestamp": {"$lt": datetime.combine(until, datetime.min.time())}}
+    stats_query = {"day": {"$lt": until.isoformat()}}
+    if company_id is not None:
+        attendance_query["company_id"] = ppe_query["company_id"] = stats_query["company_id"] = company_id
+    if since is not None:
+        attendance_query["attendance_date"]["$gte"] = stats_query["day"]["$gte"] = since.isoformat()
+        ppe_query["timestamp"]["$gte"] = datetime.combine(since, datetime.min.time())
+
+    async for row in attendance_col.find(attendance_query, {"_id": 0}):
+        if row.get("company_id") and row.get("attendance_date"):
+            fold(attendance_deltas(row["company_id"], row.get("employee_email"), row["attendance_date"],
+                                   row.get("present") is True))
+    async for record in ppe_col.find(ppe_query, {"_id": 0}):
+        if record.get("company_id") and isinstance(record.get("timestamp"), datetime):
+            fold(ppe_deltas(record))
+
+    # replace rather than delete + insert, so the rebuild is idempotent and never trips over an existing _id
+    ops = [ReplaceOne({"_id": _id}, {**doc, **_nest(counters[_id])}, upsert=True) for _id, doc in docs.items()]
+    for start in range(0, len(ops), batch_size):
+        await daily_stats_col.bulk_write(ops[start:start + batch_size], ordered=False)
+
+    # docs for days in range that no longer have any raw rows
+    stale = [doc["_id"] async for doc in daily_stats_col.find(stats_query, {"_id": 1}) if doc["_id"] not in docs]
+    if stale:
+        await daily_stats_col.delete_many({"_id": {"$in": stale}})
+    print(f"[Rollup] Rebuilt {len(ops)} daily_stats documents, removed {len(stale)} stale")
+    return len(ops)
@@ -0,0 +1,240 @@
+import asyncio
+from datetime import date, datetime, time, timedelta
+from typing import Optional
+from backend.db import db
+from backend.crud.daily_stats import PPE_ITEMS, company_days, daily_stats_col
+
+attendance_col = db["attendance"]
+ppe_col = db["ppe_records"]
+
+
+def day_start(d: date) -> datetime:
+    return datetime.combine(d, time.min)
+
+
+# ----------------------------
+# Attendance: one $facet pass over the whole date window
+# ----------------------------
+async def attendance_summary(company_id: str, start: date, end: date, detail_start: Optional[date] = None) -> dict:
+    """
+    Attendance counts for every day in [start, end], plus the unique absentee
+    count and per-employee present days over [detail_start, end].
+
+    Returns {"daily": {iso_date: {"present", "absent"}}, "absent_employees": int,
+             "present_days": {email: days}}.
+    """
+    detail_from = (detail_start or start).isoformat()
+    pipeline = [
+        {"$match": {
+            "company_id": company_id,
+            "attendance_date": {"$gte": start.isoformat(), "$lte": end.isoformat()},
+        }},
+        {"$facet": {
+            "daily": [
+                {"$group": {
+                    "_id": "$attendance_date",
+                    "present": {"$sum": {"$cond": [{"$eq": ["$present", True]}, 1, 0]}},
+                    "absent": {"$sum": {"$cond": [{"$eq": ["$present", False]}, 1, 0]}},
+                }},
+            ],
+            "absent_employees": [
+                {"$match": {
+                    "attendance_date": {"$gte": detail_from},
+                    "present": {"$ne": True},
+                    "employee_email": {"$nin": [None, ""]},
+                }},
+                {"$group": {"_id": "$employee_email"}},
+                {"$count": "count"},
+            ],
+            "present_days": [
+                {"$match": {"attendance_date": {"$gte": detail_from}, "present": True}},
+                {"$group": {"_id": "$employee_email", "days": {"$sum": 1}}},
+            ],
+        }},
+    ]
+    result = (await attendance_col.aggregate(pipeline).to_list(length=1))[0]
+    absent = result["absent_employees"]
+    return {
+        "daily": {row["_id"]: {"present": row["present"], "absent": row["absent"]} for row in result["daily"]},
+        "absent_employees": absent[0]["count"] if absent else 0,
+        "present_days": {row["_id"]: row["days"] for row in result["present_days"] if row["_id"]},
+    }
+
+
+# ----------------------------
+# PPE records: per-record compliance is derived server-side, then grouped by
+# day, by violated item and by employee in the same pass
+# ----------------------------
+PPE_RECORD_FIELDS = [
+    {"$addFields": {
+        "day": {"$dateToString": {"format": "%Y-%m-%d", "date": "$timestamp"}},
+        "pairs": {"$objectToArray": {"$ifNull": ["$ppe_result", {}]}},
+    }},
+    {"$addFields": {
+        # a record with an empty ppe_result is not counted as a check
+        "checked": {"$gt": [{"$size": "$pairs"}, 0]},
+        "missed": {"$subtract": [len(PPE_ITEMS), {"$size": {"$filter": {
+            "input": "$pairs",
+            "cond": {"$and": [{"$ne": ["$$this.k", "person"]}, "$$this.v"]},
+        }}}]},
+        "violated": {"$map": {
+            "input": {"$filter": {
+                "input": "$pairs",
+                "cond": {"$and": [{"$in": ["$$this.k", PPE_ITEMS]}, {"$not": "$$this.v"}]},
+            }},
+            "in": "$$this.k",
+        }},
+    }},
+    {"$addFields": {
+        "compliance": {"$switch": {
+            "branches": [
+                {"case": {"$eq": ["$missed", 0]}, "then": "fully"},
+                {"case": {"$and": [{"$gte": ["$missed", 1]}, {"$lte": ["$missed", 2]}]}, "then": "partial"},
+            ],
+            "default": "non",
+        }},
+    }},
+]
+
+
+def _count_if(field: str, value) -> dict:
+    return {"$sum": {"$cond": [{"$eq": [field, value]}, 1, 0]}}
+
+
+async def ppe_summary(company_id: str, start: date, end: date, detail_start: Optional[date] = None,
+                      top: int = 6) -> dict:
+    """
+    PPE check tallies for every day in [start, end], plus violated-item counts and
+    the `top` employees with the most missed items over [detail_start, end].
+
+    Returns {"daily": {iso_date: {"checked", "fully", "partial", "non"}},
+             "violations": {item: count},
+             "employees": [{"email", "missed", "checks"}]}  # worst first
+    """
+    detail_from = day_start(detail_start or start)
+    pipeline = [
+        {"$match": {
+            "company_id": company_id,
+            "timestamp": {"$gte": day_start(start), "$lt": day_start(end + timedelta(days=1))},
+        }},
+        *PPE_RECORD_FIELDS,
+        {"$facet": {
+            "daily": [
+                {"$match": {"checked": True}},
+                {"$group": {
+                    "_id": "$day",
+                    "checked": {"$sum": 1},
+                    "fully": _count_if("$compliance", "fully"),
+                    "partial": _count_if("$compliance", "partial"),
+                    "non": _count_if("$compliance", "non"),
+                }},
+            ],
+            "violations": [
+                {"$match": {"checked": True, "timestamp": {"$gte": detail_from}}},
+                {"$unwind": "$violated"},
+                {"$group": {"_id": "$violated", "count": {"$sum": 1}}},
+            ],
+            "employees": [
+                {"$match": {"timestamp": {"$gte": detail_from}, "employee_email": {"$nin": [None, ""]}}},
+                {"$group": {
+                    "_id": "$employee_email",
+                    "checks": {"$sum": 1},
+                    "checked": {"$sum": {"$cond": ["$checked", 1, 0]}},
+                    "missed": {"$sum": {"$cond": ["$checked", "$missed", 0]}},
+                    "first": {"$min": {"$cond": ["$checked", "$timestamp", None]}},
+                }},
+                {"$match": {"checked": {"$gt": 0}}},
+                # ties keep the order employees were first checked in
+                {"$sort": {"missed": -1, "first": 1}},
+                {"$limit": top},
+            ],
+        }},
+    ]
+    result = (await ppe_col.aggregate(pipeline).to_list(length=1))[0]
+    return {
+        "daily": {
+            row["_id"]: {k: row[k] for k in ("checked", "fully", "partial", "non")}
+            for row in result["daily"]
+        },
+        "violations": {row["_id"]: row["count"] for row in result["violations"]},
+        "employees": [
+            {"email": row["_id"], "missed": row["missed"], "checks": row["checks"]}
+            for row in result["employees"]
+        ],
+    }
+
+
+# ----------------------------
+# Same summaries from the daily_stats rollup: one doc per company day, plus one
+# $group over the employee-day docs of the detail range
+# ----------------------------
+async def rollup_summary(company_id: str, start: date, end: date, detail_start: Optional[date] = None,
+                         top: int = 6):
+    """Returns (attendance, ppe) shaped like attendance_summary / ppe_summary."""
+    detail_from = (detail_start or start).isoformat()
+    pipeline = [
+        {"$match": {
+            "scope": "employee",
+            "company_id": company_id,
+            "day": {"$gte": detail_from, "$lte": end.isoformat()},
+        }},
+        {"$group": {
+            "_id": "$employee_email",
+            "present_days": {"$sum": {"$cond": [{"$gt": ["$present", 0]}, 1, 0]}},
+            "absent_days": {"$sum": {"$cond": [{"$gt": ["$absent", 0]}, 1, 0]}},
+            "records": {"$sum": {"$ifNull": ["$records", 0]}},
+            "checked": {"$sum": {"$ifNull": ["$checked", 0]}},
+            "missed": {"$sum": {"$ifNull": ["$missed", 0]}},
+            "first": {"$min": "$first_check"},
+        }},
+    ]
+    days, employees = await asyncio.gather(company_days(company_id, start, end),
+                                           daily_stats_col.aggregate(pipeline).to_list(length=None))
+
+    attendance = {
+        "daily": {
+            day: {"present": doc.get("present", 0), "absent": doc.get("absent", 0)}
+            for day, doc in days.items() if doc.get("present", 0) + doc.get("absent", 0) > 0
+        },
+        "absent_employees": sum(1 for e in employees if e["absent_days"] and e["_id"]),
+        "present_days": {e["_id"]: e["present_days"] for e in employees if e["present_days"] and e["_id"]},
+    }
+
+    violations = {}
+    for day, doc in days.items():
+        if day >= detail_from:
+            for item, count in (doc.get("violations") or {}).items():
+                violations[item] = violations.get(item, 0) + count
+
+    ranked = sorted((e for e in employees if e["checked"] > 0 and e["_id"]),
+                    key=lambda e: (-e["missed"], e["first"] or datetime.max))
+    ppe = {
+        "daily": {
+            day: {k: doc.get(k, 0) for k in ("checked", "fully", "partial", "non")}
+            for day, doc in days.items() if doc.get("checked")
+        },
+        "violations": violations,
+        "employees": [{"email": e["_id"], "missed": e["missed"], "checks": e["records"]} for e in ranked[:top]],
+    }
+    return attendance, ppe
+
+
+def safety_rate(fully: int, partial: int, checked: int) -> Optional[float]:
+    if not checked:
+        return None
+    return round(((fully + partial * 0.6) / checked) * 100, 2)
+
+
+def top_needing_improvement(employees: list, emp_map: dict) -> list:
+    top = []
+    for row in employees:
+        emp = emp_map.get(row["email"], {})
+        max_items = max(1, row["checks"] * 5)
+        top.append({
+            "employee_email": row["email"],
+            "employee_id": emp.get("employee_id") or "",
+            "name": emp.get("name") or row["email"],
+            "violation_count": row["missed"],
+            "overall_worn_percent": round(((max_items - row["missed"]) / max_items) * 100, 2),
+        })
+    return top
@@ -1,7 +1,6 @@
 from fastapi import HTTPException,status
 from datetime import date
 from backend.db import db
-from backend.models.employee import EmployeeCreate,Attendance
 from typing import Dict
 from bson import ObjectId
 from backend.utils.password import hash_pwd
@@ -30,8 +29,10 @@ async def save_employee(employee_data: Dict) -> bool:
 # ----------------------------
 # Get all employees
 # ----------------------------
-async def get_employees(company_id:str):
-    employees = await employee_col.find({"company_id":company_id}).to_list()
+async def get_employees(company_id:str, with_embedding: bool = False):
+    # embeddings are only needed by the face gallery, keep them off the wire for listings
+    projection = None if with_embedding else {"embedding": 0}
+    employees = await employee_col.find({"company_id":company_id}, projection).to_list()
     if not employees:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Employees with this company had not been placed!")
 
@@ -66,30 +67,6 @@ async def delete_employee_db(employee_id: str) -> bool:
 
 
 
-# ----------------------------
-# marked attendance employee
-# ----------------------------
-
-async def marked_attended(emp:Attendance):
-    attendance_data = emp.model_dump()
-    print(attendance_data)
-    today = date.today().isoformat()
-    attendance_data["attendance_date"] =today
-    existing = await attendance_col.find_one({
-        "employee_email": attendance_data["employee_email"],
-        "attendance_date": today
-    })
-    if existing:
-        return {"status": "Already marked today"}
-
-    try:
-        await attendance_col.insert_one(attendance_data)
-        return True
-    except Exception as e:
-        print(f"Error inserting into attendance table: {e}")
-        return False
-
-
 # ----------------------------
 # get attendance list
 # ----------------------------
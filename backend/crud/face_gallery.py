@@ -0,0 +1,142 @@
+import asyncio
+import time
+import numpy as np
+from typing import Dict, List, Optional, Tuple
+from backend.db import db
+from backend.config import GalleryConfig
+from backend.utils.versions import create_versions
+from backend.crud.face_index import build_index
+from backend.crud.helper import decode_embedding
+
+employee_col = db["employee"]
+gallery_versions = create_versions(GalleryConfig.VERSIONS, "gallery")
+
+FACE_MATCH_THRESHOLD = 0.35  # cosine similarity (higher is better)
+
+GALLERY_FIELDS = {"employee_id": 1, "name": 1, "email": 1, "image_path": 1, "embedding": 1}
+
+_galleries: Dict[str, tuple] = {}  # company_id -> (loaded_at, version, gallery)
+_locks: Dict[str, asyncio.Lock] = {}
+
+
+def normalize(embedding) -> np.ndarray:
+    vec = np.asarray(embedding, dtype=np.float32).ravel()
+    norm = np.linalg.norm(vec)
+    return vec / norm if norm > 0 else vec
+
+
+class FaceGallery:
+    """Pre-normalized embedding matrix for one company, with parallel id/metadata arrays."""
+
+    def __init__(self, ids: List[str], embeddings: List, metadata: List[dict]):
+        self.ids = ids
+        self.metadata = metadata
+        if embeddings:
+            matrix = np.asarray(embeddings, dtype=np.float32)
+            norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            self.matrix = matrix / norms
+        else:
+            self.matrix = np.empty((0, 0), dtype=np.float32)
+        self.index = build_index(self.matrix)
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def dim(self) -> int:
+        return self.matrix.shape[1] if len(self) else 0
+
+    def search(self, embedding, k: int = 1, **knobs) -> List[Tuple[int, float]]:
+        """Return the top-k (row, cosine score) pairs, best first."""
+        if not len(self) or np.asarray(embedding).size != self.dim:
+            return []
+        return self.index.search(normalize(embedding), k, **knobs)
+
+
+async def load_gallery(company_id: str) -> FaceGallery:
+    ids, embeddings, metadata = [], [], []
+    cursor = employee_col.find({"company_id": company_id}, GALLERY_FIELDS)
+    async for emp in cursor:
+        if not emp.get("embedding"):
+            continue
+        ids.append(str(emp["_id"]))
+        embeddings.append(decode_embedding(emp["embedding"]))
+        metadata.append({
+            "employee_id": emp.get("employee_id"),
+            "name": emp.get("name"),
+            "email": emp.get("email"),
+            "image_path": emp.get("image_path"),
+        })
+    print(f"[Gallery] Loaded {len(ids)} embeddings for company {company_id}")
+    # building the matrix (and the ANN index for large tenants) is CPU bound
+    return await asyncio.to_thread(FaceGallery, ids, embeddings, metadata)
+
+
+# ----------------------------
+# Lazily built per-company cache. Entries carry the invalidation version they were
+# loaded at and are only reused while it still matches, so an enroll, update or
+# delete on any worker invalidates every worker's copy.
+# ----------------------------
+async def _version(company_id: str) -> Optional[tuple]:
+    try:
+        return await gallery_versions.current(company_id)
+    except Exception as e:
+        # fall back to the TTL alone
+        print(f"[Gallery] Could not read version for {company_id}: {e}")
+        return None
+
+
+def _cached(company_id: str, version: Optional[tuple]) -> Optional[FaceGallery]:
+    entry = _galleries.get(company_id)
+    if entry is None:
+        return None
+    loaded_at, loaded_version, gallery = entry
+    if time.time() - loaded_at > GalleryConfig.TTL or (version is not None and loaded_version != version):
+        return None
+    return gallery
+
+
+async def get_gallery(company_id: str) -> FaceGallery:
+    version = await _version(company_id)
+    gallery = _cached(company_id, version)
+    if gallery is not None:
+        return gallery
+
+    lock = _locks.setdefault(company_id, asyncio.Lock())
+    async with lock:
+        gallery = _cached(company_id, version)
+        if gallery is None:
+            gallery = await load_gallery(company_id)
+            # an invalidation that landed during the load may not be reflected, so don't keep it
+            if version is not None and await _version(company_id) == version:
+                _galleries[company_id] = (time.time(), version, gallery)
+    return gallery
+
+
+async def invalidate_gallery(company_id: Optional[str] = None):
+    if company_id is None:
+        _galleries.clear()
+    else:
+        _galleries.pop(company_id, None)
+    try:
+        if company_id is None:
+            await gallery_versions.bump_all()
+        else:
+            await gallery_versions.bump(company_id)
+    except Exception as e:
+        print(f"[Gallery] Could not bump version: {e}")
+
+
+async def close_galleries():
+    await gallery_versions.close()
+
+
+async def identify(company_id: str, embedding) -> Optional[Tuple[dict, float]]:
+    """Best gallery match above FACE_MATCH_THRESHOLD, as (employee metadata, score)."""
+    gallery = await get_gallery(company_id)
+    matches = gallery.search(embedding, k=1)
+    if matches and matches[0][1] > FACE_MATCH_THRESHOLD:
+        row, score = matches[0]
+        return gallery.metadata[row], score
+    return None
@@ -0,0 +1,123 @@
+import numpy as np
+from typing import List, Optional, Tuple
+from backend.config import FaceIndexConfig
+
+ASSIGN_CHUNK = 4096
+PCA_SAMPLE = 2048
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k highest scores, best first."""
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    if k < len(scores):
+        top = np.argpartition(-scores, k - 1)[:k]
+    else:
+        top = np.arange(len(scores))
+    return top[np.argsort(-scores[top])]
+
+
+class ExactIndex:
+    """Brute-force scan of the full normalized matrix."""
+
+    def __init__(self, matrix: np.ndarray):
+        self.matrix = matrix
+
+    def search(self, query: np.ndarray, k: int = 1, **_knobs) -> List[Tuple[int, float]]:
+        scores = self.matrix @ query
+        return [(int(i), float(scores[i])) for i in top_k(scores, k)]
+
+
+class IVFIndex:
+    """
+    Inverted-file index. Rows are projected onto their top `coarse_dim` principal
+    directions and clustered with spherical k-means; a query scans only the
+    `nprobe` closest clusters in the projected space, then the best `rerank`
+    candidates are re-scored exactly against the full float32 rows.
+
+    Raising `nprobe` or `rerank` trades latency for recall@1.
+    """
+
+    def __init__(self, matrix: np.ndarray, nlist: int = 0, nprobe: int = FaceIndexConfig.NPROBE,
+                 rerank: int = FaceIndexConfig.RERANK, coarse_dim: int = FaceIndexConfig.COARSE_DIM,
+                 n_iter: int = FaceIndexConfig.KMEANS_ITERS, train_sample: int = FaceIndexConfig.TRAIN_SAMPLE,
+                 seed: int = 0):
+        self.matrix = matrix
+        self.nlist = min(nlist or max(1, int(np.sqrt(len(matrix)))), len(matrix))
+        self.nprobe = nprobe
+        self.rerank = rerank
+
+        rng = np.random.default_rng(seed)
+        self.projection = self._fit_projection(rng, coarse_dim)
+        self.coarse = self._project(matrix)
+
+        self.centroids = self._train(rng, n_iter, train_sample)
+        assignment = self._assign(self.coarse)
+        order = np.argsort(assignment, kind="stable")
+        bounds = np.searchsorted(assignment[order], np.arange(self.nlist + 1))
+        self.lists = [order[bounds[c]:bounds[c + 1]] for c in range(self.nlist)]
+
+    def _fit_projection(self, rng, coarse_dim: int) -> Optional[np.ndarray]:
+        if not coarse_dim or coarse_dim >= self.matrix.shape[1]:
+            return None
+        sample = self.matrix
+        if len(sample) > PCA_SAMPLE:
+            sample = sample[rng.choice(len(sample), PCA_SAMPLE, replace=False)]
+        _, _, vt = np.linalg.svd(sample, full_matrices=False)
+        return np.ascontiguousarray(vt[:coarse_dim].T, dtype=np.float32)
+
+    def _project(self, rows: np.ndarray) -> np.ndarray:
+        return rows if self.projection is None else rows @ self.projection
+
+    def _train(self, rng, n_iter: int, train_sample: int) -> np.ndarray:
+        sample = self.coarse
+        if len(sample) > train_sample:
+            sample = sample[rng.choice(len(sample), train_sample, replace=False)]
+        centroids = sample[rng.choice(len(sample), self.nlist, replace=False)].copy()
+
+        for _ in range(n_iter):
+            labels = self._assign(sample, centroids)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, labels, sample)
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            empty = norms[:, 0] == 0
+            # re-seed empty clusters from random rows so every list stays usable
+            if empty.any():
+                sums[empty] = sample[rng.choice(len(sample), int(empty.sum()), replace=False)]
+                norms[empty] = np.linalg.norm(sums[empty], axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            centroids = sums / norms
+        return centroids
+
+    def _assign(self, rows: np.ndarray, centroids: Optional[np.ndarray] = None) -> np.ndarray:
+        centroids = self.centroids if centroids is None else centroids
+        labels = np.empty(len(rows), dtype=np.int64)
+        for start in range(0, len(rows), ASSIGN_CHUNK):
+            chunk = rows[start:start + ASSIGN_CHUNK]
+            labels[start:start + ASSIGN_CHUNK] = np.argmax(chunk @ centroids.T, axis=1)
+        return labels
+
+    def search(self, query: np.ndarray, k: int = 1, nprobe: Optional[int] = None,
+               rerank: Optional[int] = None) -> List[Tuple[int, float]]:
+        nprobe = min(nprobe or self.nprobe, self.nlist)
+        rerank = max(rerank or self.rerank, k)
+
+        coarse_query = self._project(query)
+        probes = top_k(self.centroids @ coarse_query, nprobe)
+        candidates = np.concatenate([self.lists[c] for c in probes])
+        if not len(candidates):
+            return []
+
+        shortlist = candidates[top_k(self.coarse[candidates] @ coarse_query, rerank)]
+        exact_scores = self.matrix[shortlist] @ query
+        return [(int(shortlist[i]), float(exact_scores[i])) for i in top_k(exact_scores, k)]
+
+
+def build_index(matrix: np.ndarray, backend: str = FaceIndexConfig.BACKEND):
+    """Pick the search backend for a gallery; small galleries always use the exact scan."""
+    if backend == "ivf" and len(matrix) >= FaceIndexConfig.MIN_SIZE:
+        index = IVFIndex(matrix, nlist=FaceIndexConfig.NLIST)
+        print(f"[Index] Built IVF index: {len(matrix)} rows, {index.nlist} lists")
+        return index
+    return ExactIndex(matrix)
@@ -1,11 +1,34 @@
 import numpy as np
+from bson.binary import Binary
+from backend.config import EmbeddingConfig
+
+# user-defined BSON binary subtypes, so readers know the element width
+EMBEDDING_SUBTYPES = {"float32": 0x80, "float16": 0x81}
+SUBTYPE_DTYPES = {0x80: np.float32, 0x81: np.float16}
+
+
+# ----------------------------
+# Binary embedding encoding
+# ----------------------------
+def encode_embedding(embedding, dtype: str = EmbeddingConfig.DTYPE) -> Binary:
+    vec = np.asarray(embedding, dtype=np.float32).ravel()
+    norm = np.linalg.norm(vec)
+    if norm > 0:
+        vec = vec / norm
+    return Binary(vec.astype(dtype).tobytes(), EMBEDDING_SUBTYPES[dtype])
+
+
+def decode_embedding(value) -> np.ndarray:
+    """Read a stored embedding (binary blob or legacy float list) as a NumPy vector."""
+    if isinstance(value, Binary):
+        return np.frombuffer(value, dtype=SUBTYPE_DTYPES.get(value.subtype, np.float32))
+    if isinstance(value, bytes):
+        return np.frombuffer(value, dtype=np.float32)
+    return np.asarray(value, dtype=np.float32)
 
-def cosine_similarity(a, b):
-    return np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b))
 
 # format embedding
 def format_embedding_result(result: dict) -> dict:
-    embedding_clean = [round(float(x), 5) for x in result["embedding"]]
     facial_area = {
         "x": result["facial_area"]["x"],
         "y": result["facial_area"]["y"],
@@ -13,6 +36,6 @@ def format_embedding_result(result: dict) -> dict:
         "h": result["facial_area"]["h"]
     }
     return {
-        "embedding": embedding_clean,
+        "embedding": encode_embedding(result["embedding"]),
         "facial_area": facial_area
     }
@@ -0,0 +1,128 @@
+import asyncio
+import os
+from datetime import datetime
+from typing import Optional
+from bson import ObjectId
+from fastapi import HTTPException, status
+from backend.db import db
+from backend.config import AuditConfig
+from backend.utils.inference import run_inference
+from backend.utils.scheduler import gate_scheduler
+from backend.utils.video_audit import WindowAggregator, batched, iter_video_frames, summarize
+
+audit_col = db["ppe_audits"]
+audit_window_col = db["ppe_audit_windows"]
+
+
+async def create_audit(company_id: str, source: str, sample_fps: float, window_sec: float) -> str:
+    result = await audit_col.insert_one({
+        "company_id": company_id,
+        "source": source,
+        "sample_fps": sample_fps,
+        "window_sec": window_sec,
+        "status": "queued",
+        "created_at": datetime.now(),
+    })
+    return str(result.inserted_id)
+
+
+async def save_audit_window(audit_id: str, company_id: str, window: dict):
+    await audit_window_col.insert_one({"audit_id": audit_id, "company_id": company_id, **window})
+
+
+async def finish_audit(audit_id: str, summary: Optional[dict] = None, error: Optional[str] = None):
+    update = {"status": "failed" if error else "done", "finished_at": datetime.now()}
+    if summary is not None:
+        update["summary"] = summary
+    if error:
+        update["error"] = error
+    await audit_col.update_one({"_id": ObjectId(audit_id)}, {"$set": update})
+
+
+async def get_audit(audit_id: str, company_id: str) -> Optional[dict]:
+    if not ObjectId.is_valid(audit_id):
+        return None
+    audit = await audit_col.find_one({"_id": ObjectId(audit_id), "company_id": company_id})
+    if not audit:
+        return None
+    audit["_id"] = str(audit["_id"])
+    cursor = audit_window_col.find({"audit_id": audit_id}, {"_id": 0, "audit_id": 0, "company_id": 0})
+    audit["windows"] = await cursor.sort("window_start", 1).to_list(length=None)
+    return audit
+
+
+# ----------------------------
+# Background audit job
+# ----------------------------
+RETRYABLE = (status.HTTP_429_TOO_MANY_REQUESTS, status.HTTP_503_SERVICE_UNAVAILABLE)
+
+
+def retry_delay(error: HTTPException, attempt: int) -> float:
+    """Retry-After when the server gave one, else exponential backoff; capped at RETRY_MAX_WAIT."""
+    try:
+        delay = float((error.headers or {}).get("Retry-After"))
+    except (TypeError, ValueError):
+        delay = 2 ** attempt
+    return min(max(delay, 0.1), AuditConfig.RETRY_MAX_WAIT)
+
+
+async def detect_batch(company_id: str, images: list, max_retries: int = AuditConfig.MAX_RETRIES):
+    """
+    Run PPE detection on one batch; a busy moment at the gates (429 from the
+    scheduler, 503 from the inference queue) is waited out instead of failing
+    the whole audit.
+    """
+    from backend.utils.vision import detect_ppe_batch
+
+    attempt = 0
+    while True:
+        try:
+            # audits queue alongside the company's gates, so live checks keep their turn
+            async with gate_scheduler.slot(f"{company_id}:audit"):
+                return await run_inference(detect_ppe_batch, images)
+        except HTTPException as e:
+            if e.status_code not in RETRYABLE or attempt >= max_retries:
+                raise
+            delay = retry_delay(e, attempt)
+            attempt += 1
+            print(f"[Audit] Batch rejected ({e.status_code}), retry {attempt}/{max_retries} in {delay:.1f}s")
+            await asyncio.sleep(delay)
+
+
+async def run_audit_job(audit_id: str, company_id: str, path: str, sample_fps: float = AuditConfig.SAMPLE_FPS,
+                        window_sec: float = AuditConfig.WINDOW_SEC, batch_size: int = AuditConfig.BATCH,
+                        remove_file: bool = False):
+    """
+    Same pipeline as video_audit.audit_video, driven from the event loop: frames are
+    decoded on a worker thread one batch at a time, detection goes through the shared
+    inference executor, and each window is written as soon as it closes.
+    """
+    await audit_col.update_one({"_id": ObjectId(audit_id)},
+                               {"$set": {"status": "running", "started_at": datetime.now()}})
+    aggregator = WindowAggregator(window_sec)
+    windows = []
+    try:
+        batches = batched(iter_video_frames(path, sample_fps), batch_size)
+        while True:
+            batch = await asyncio.to_thread(next, batches, None)
+            if batch is None:
+                break
+            results = await detect_batch(company_id, [image for _, image in batch])
+            for (timestamp, _), detections in zip(batch, results):
+                window = aggregator.add(timestamp, detections)
+                if window is not None:
+                    windows.append(window)
+                    await save_audit_window(audit_id, company_id, window)
+
+        window = aggregator.close()
+        if window is not None:
+            windows.append(window)
+            await save_audit_window(audit_id, company_id, window)
+        await finish_audit(audit_id, summarize(windows))
+        print(f"[Audit] {audit_id} done: {len(windows)} windows")
+    except Exception as e:
+        print(f"[Audit] {audit_id} failed: {e}")
+        await finish_audit(audit_id, summarize(windows), error=str(e))
+    finally:
+        if remove_file and os.path.exists(path):
+            os.remove(path)
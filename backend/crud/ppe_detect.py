@@ -1,14 +1,23 @@
+import asyncio
+from bson import ObjectId
+from pymongo import UpdateOne
 from backend.db import db
-from backend.models.detect import PPERecordCreate, PPEResult
-from datetime import datetime
+from backend.config import WriteConfig
+from backend.utils.write_queue import BatchedWriter
+from backend.utils.dashboard_cache import dashboard_cache
+from backend.crud.daily_stats import daily_stats_col, apply_rollup, attendance_rollup_ops, ppe_rollup_ops
+from datetime import datetime, date
 
 ppe_collection = db["ppe_records"]
 employee_col = db["employee"]
+attendance_col = db["attendance"]
 
+ppe_writer = BatchedWriter(WriteConfig.MAX_BATCH, WriteConfig.MAX_WAIT_MS, WriteConfig.MAX_QUEUE)
 
-async def save_ppe_record(employee_email: str, company_id: str, ppe_status: dict, points_today: int,
-                          compliance_status: str):
-    record = {
+
+def build_ppe_record(employee_email: str, company_id: str, ppe_status: dict, points_today: int,
+                     compliance_status: str) -> dict:
+    return {
         "employee_email": employee_email,
         "company_id": company_id,
         "ppe_result": ppe_status,
@@ -16,24 +25,79 @@ async def save_ppe_record(employee_email: str, company_id: str, ppe_status: dict
         "today_points": points_today,
         "compliance_status": compliance_status
     }
-    print(record)
+
+
+async def add_points(employee_email: str, points: int) -> bool:
+    # $inc is applied server-side, so concurrent check-ins can't overwrite each other's points
+    result = await employee_col.update_one({"email": employee_email}, {"$inc": {"point_total": points}})
+    if not result.matched_count:
+        print(f"[WARN] No employee found for email: {employee_email}")
+    return result.matched_count > 0
+
+
+# ----------------------------
+# Finalize a PPE check
+# ----------------------------
+def attendance_upsert(employee_email: str, company_id: str) -> UpdateOne:
+    return UpdateOne(
+        {"employee_email": employee_email, "attendance_date": date.today().isoformat()},
+        {"$setOnInsert": {"company_id": company_id, "present": True}},
+        upsert=True
+    )
+
+
+async def write_ppe_check(employee_email: str, company_id: str, ppe_status: dict, points_today: int,
+                          compliance_status: str) -> bool:
+    """
+    The PPE record is inserted first; only once it exists are the dependent writes
+    issued concurrently: an atomic $inc of the employee's points, an attendance
+    upsert keyed by (email, date) and the daily_stats rollup. Attendance is only
+    rolled up if the upsert inserted.
+    """
+    record = build_ppe_record(employee_email, company_id, ppe_status, points_today, compliance_status)
     try:
         await ppe_collection.insert_one(record)
-        employee = await employee_col.find_one({"email": employee_email})
-        if employee:
-            current_total = employee["point_total"]
-            new_total = current_total + points_today
-
-            await employee_col.update_one(
-                {"_id": employee["_id"]},
-                {"$set": {"point_total": new_total}}
-            )
-            print(f"[DB] Updated total points for {employee_email}: {new_total}")
-        else:
-            print(f"[WARN] No employee found for email: {employee_email}")
-
+        _, attendance, _ = await asyncio.gather(
+            add_points(employee_email, points_today),
+            attendance_col.bulk_write([attendance_upsert(employee_email, company_id)]),
+            apply_rollup(ppe_rollup_ops(record)),
+        )
+        if attendance.upserted_count:
+            await apply_rollup(attendance_rollup_ops(company_id, employee_email, date.today().isoformat(), True))
+        await dashboard_cache.invalidate(company_id)
+        print(f"[DB] PPE record saved for {employee_email} ({points_today} pts)")
         return True
-
-    except:
-        print("Error Saving")
+    except Exception as e:
+        print(f"[DB] Error saving PPE check for {employee_email}: {e}")
         return False
+
+
+async def queue_ppe_check(employee_email: str, company_id: str, ppe_status: dict, points_today: int,
+                          compliance_status: str) -> bool:
+    """
+    Same writes as write_ppe_check, coalesced with other gates' by ppe_writer. The
+    record goes in as an upsert on a fresh _id so the dependent writes can ride
+    on it as follow-ups: they are only issued once the record was written.
+    """
+    record = build_ppe_record(employee_email, company_id, ppe_status, points_today, compliance_status)
+    attendance_rollup = [
+        (daily_stats_col, op)
+        for op in attendance_rollup_ops(company_id, employee_email, date.today().isoformat(), True)
+    ]
+    await ppe_writer.write(
+        ppe_collection, UpdateOne({"_id": ObjectId()}, {"$setOnInsert": record}, upsert=True),
+        if_upserted=[
+            (employee_col, UpdateOne({"email": employee_email}, {"$inc": {"point_total": points_today}})),
+            *((daily_stats_col, op) for op in ppe_rollup_ops(record)),
+            (attendance_col, attendance_upsert(employee_email, company_id), attendance_rollup),
+        ],
+        on_written=lambda: dashboard_cache.invalidate(company_id)
+    )
+    return True
+
+
+async def finalize_ppe_check(employee_email: str, company_id: str, ppe_status: dict, points_today: int,
+                             compliance_status: str, write_behind: bool = WriteConfig.WRITE_BEHIND) -> bool:
+    if write_behind:
+        return await queue_ppe_check(employee_email, company_id, ppe_status, points_today, compliance_status)
+    return await write_ppe_check(employee_email, company_id, ppe_status, points_today, compliance_status)
@@ -0,0 +1,70 @@
+from pymongo import ASCENDING, IndexModel
+from pymongo.errors import OperationFailure
+from backend.db import db
+
+# Every hot query filters on the leading fields of one of these.
+INDEXES = {
+    "admin": [
+        IndexModel([("email", ASCENDING)], name="admin_email", unique=True),
+    ],
+    "company": [
+        IndexModel([("email", ASCENDING)], name="company_email", unique=True),
+    ],
+    "employee": [
+        IndexModel([("company_id", ASCENDING)], name="employee_company"),
+        IndexModel([("email", ASCENDING)], name="employee_email", unique=True),
+    ],
+    "attendance": [
+        IndexModel([("company_id", ASCENDING), ("attendance_date", ASCENDING)], name="attendance_company_date"),
+        # also what keeps the finalize upsert to one row per employee per day
+        IndexModel([("employee_email", ASCENDING), ("attendance_date", ASCENDING)], name="attendance_email_date",
+                   unique=True),
+    ],
+    "ppe_records": [
+        IndexModel([("company_id", ASCENDING), ("timestamp", ASCENDING)], name="ppe_company_timestamp"),
+        IndexModel([("employee_email", ASCENDING), ("timestamp", ASCENDING)], name="ppe_email_timestamp"),
+    ],
+    "daily_stats": [
+        IndexModel([("scope", ASCENDING), ("company_id", ASCENDING), ("day", ASCENDING)], name="stats_company_day"),
+        IndexModel([("scope", ASCENDING), ("employee_email", ASCENDING), ("day", ASCENDING)], name="stats_email_day"),
+    ],
+    "ppe_audit_windows": [
+        IndexModel([("audit_id", ASCENDING), ("window_start", ASCENDING)], name="audit_window_start"),
+    ],
+}
+
+
+async def ensure_collection_indexes(name: str, models: list) -> dict:
+    """
+    Create the indexes of one collection; existing ones with the same spec are a
+    no-op. A unique index that existing duplicates prevent is created without
+    the constraint instead, so queries still get the index.
+    """
+    collection = db[name]
+    report = {}
+    for model in models:
+        spec = model.document
+        try:
+            await collection.create_indexes([model])
+            report[spec["name"]] = "ok"
+        except OperationFailure as e:
+            if spec.get("unique") and e.code == 11000:
+                print(f"[Indexes] {name}.{spec['name']}: duplicate keys, creating it without unique: {e}")
+                await collection.create_index(list(spec["key"].items()), name=spec["name"])
+                report[spec["name"]] = "non-unique (duplicates)"
+            elif e.code in (85, 86):
+                # IndexOptionsConflict / IndexKeySpecsConflict: keep what's there, e.g. an earlier non-unique fallback
+                print(f"[Indexes] {name}.{spec['name']}: existing index differs, leaving it: {e}")
+                report[spec["name"]] = "existing (differs)"
+            else:
+                print(f"[Indexes] {name}.{spec['name']}: {e}")
+                report[spec["name"]] = f"failed: {e.code}"
+    return report
+
+
+async def ensure_indexes() -> dict:
+    report = {}
+    for name, models in INDEXES.items():
+        report[name] = await ensure_collection_indexes(name, models)
+    print(f"[Indexes] {report}")
+    return report
@@ -1,10 +1,20 @@
-from fastapi import FastAPI
+import asyncio
+from fastapi import FastAPI, Response, status
 from backend.routes.employee import employee_router
 from backend.routes.auth import router
 from backend.routes.admin import admin_router
 from backend.routes.company import company_router
 from fastapi.middleware.cors import CORSMiddleware
-from backend.routes.ppe_detection import detect_router
+from backend.routes.ppe_detection import detect_router, ppe_batcher, session_store
+from backend.crud.ppe_detect import ppe_writer
+from backend.utils.inference import inference_executor
+from backend.utils.scheduler import gate_scheduler
+from backend.utils.warmup import model_warmup
+from backend.indexes import ensure_indexes
+from backend.config import IndexConfig
+from backend.utils.frame_cache import face_frame_cache, ppe_frame_cache
+from backend.utils.dashboard_cache import dashboard_cache
+from backend.crud.face_gallery import close_galleries
 
 app = FastAPI()
 
@@ -33,4 +43,43 @@ async def startup_event():
         if hasattr(route, "path"):
             print(f"{route.methods} {route.path}")
     print("=========================")
+    # models load in the background; /health/ready flips once they're warm
+    model_warmup.start()
+    if IndexConfig.ENSURE_ON_STARTUP:
+        # idempotent; runs in the background so a large first-time build doesn't hold up startup
+        app.state.index_task = asyncio.create_task(ensure_indexes())
 
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await ppe_writer.close()
+    inference_executor.shutdown()
+    await session_store.close()
+    await dashboard_cache.close()
+    await close_galleries()
+
+
+@app.get("/health/live")
+async def health_live():
+    return {"status": "ok"}
+
+
+@app.get("/health/ready")
+async def health_ready(response: Response):
+    report = model_warmup.report()
+    if not report["ready"]:
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    return report
+
+
+@app.get("/metrics", response_model=dict)
+async def metrics():
+    return {
+        "inference": inference_executor.stats(),
+        "scheduler": gate_scheduler.stats(),
+        "ppe_batching": ppe_batcher.stats(),
+        "face_frame_cache": face_frame_cache.stats(),
+        "ppe_frame_cache": ppe_frame_cache.stats(),
+        "db_writes": ppe_writer.stats(),
+        "dashboard_cache": dashboard_cache.stats(),
+    }
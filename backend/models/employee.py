@@ -1,6 +1,7 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from typing import Optional, List, Dict, Literal
 from datetime import date
+from bson.binary import Binary
 
 
 class Attendance(BaseModel):
@@ -11,6 +12,8 @@ class Attendance(BaseModel):
 
 
 class EmployeeCreate(BaseModel):
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
     employee_id: str
     name: str
     email: str
@@ -18,7 +21,7 @@ class EmployeeCreate(BaseModel):
     company_id: str
     point_total: int
     role: Literal["employee"] = "employee"
-    embedding: List[float]
+    embedding: Binary
     facial_area: Optional[Dict[str, int]] = None
     image_path: str
 
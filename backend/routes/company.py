@@ -1,12 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from backend.crud.employee import get_employees, get_attendance_list
+from backend.crud.dashboard import rollup_summary, safety_rate, top_needing_improvement
+from backend.crud.daily_stats import PPE_ITEMS, apply_rollup, attendance_rollup_ops, company_days, employee_days
 from backend.models.employee import EmployeeResponse
 from backend.models.detect import EndDetectRequest
 from backend.utils.dependencies import company_required
-from datetime import date
+from backend.utils.dashboard_cache import dashboard_cache
+from backend.crud.ppe_detect import ppe_writer
 from backend.db import db
-from datetime import datetime, timedelta, date, time
+from pymongo.errors import BulkWriteError
+from datetime import timedelta, date
 from typing import List, Dict, Any
+import asyncio
 
 company_router = APIRouter(tags=["Company"])
 attendance_col = db["attendance"]
@@ -31,6 +36,9 @@ async def end_detectioin(payload: EndDetectRequest, current_user: dict = Depends
     today = date.today().isoformat()
     company_id = current_user["id"]
 
+    # queued check-ins must land first, or their attendance upsert would hit the absent row and change nothing
+    await ppe_writer.flush()
+
     # all
     employees = await get_employees(company_id)
     # today
@@ -60,7 +68,20 @@ async def end_detectioin(payload: EndDetectRequest, current_user: dict = Depends
         ]
 
         try:
-            await attendance_col.insert_many(absent_docs)
+            try:
+                await attendance_col.insert_many(absent_docs, ordered=False)
+            except BulkWriteError as e:
+                # the unique (employee_email, attendance_date) index rejects anyone who checked in meanwhile
+                errors = e.details.get("writeErrors", [])
+                if any(err.get("code") != 11000 for err in errors):
+                    raise
+                skipped = {err["index"] for err in errors}
+                absent_docs = [doc for i, doc in enumerate(absent_docs) if i not in skipped]
+            await apply_rollup([
+                op for doc in absent_docs
+                for op in attendance_rollup_ops(company_id, doc["employee_email"], today, False)
+            ])
+            await dashboard_cache.invalidate(company_id)
             absent_records.extend(absent_docs)  # add them to count
         except Exception as e:
             print(f"Error inserting absent records: {e}")
@@ -80,9 +101,12 @@ async def end_detectioin(payload: EndDetectRequest, current_user: dict = Depends
 
 
 @company_router.get("/dashboard", response_model=dict)
-async def view_dashboard(current_user: dict = Depends(company_required)):
+async def view_dashboard(request: Request, response: Response, current_user: dict = Depends(company_required)):
+    return await dashboard_cache.serve(request, response, current_user["id"], "dashboard", build_dashboard)
+
+
+async def build_dashboard(company_id: str) -> dict:
     today = date.today().isoformat()
-    company_id = current_user["id"]
 
     # Total employees
     employees = await get_employees(company_id)
@@ -90,104 +114,54 @@ async def view_dashboard(current_user: dict = Depends(company_required)):
     if total_employees == 0:
         return {"status": "No employees found for this company"}
 
-    # Attendance rate for today
-    attendance_today = await attendance_col.find({
-        "company_id": company_id,
-        "attendance_date": today
-    }).to_list()
+    # today's counts come from the daily_stats rollup instead of the raw collections
+    days, employee_rows = await asyncio.gather(
+        company_days(company_id, date.today(), date.today()),
+        employee_days(date.today(), date.today(), company_id=company_id),
+    )
+    stats = days.get(today, {})
 
-    present_count = sum(1 for a in attendance_today if a.get("present") is True)
-    absent_count = sum(1 for a in attendance_today if a.get("present") is False)
+    present_count = stats.get("present", 0)
+    absent_count = stats.get("absent", 0)
 
     # Check for division by zero
     average_attendance_rate = round((present_count / total_employees) * 100, 2) if total_employees > 0 else 0
 
-    # PPE results for today
-    today_date = datetime.utcnow().date()
-    tomorrow_date = today_date + timedelta(days=1)
-
-    ppe_results = await ppe_col.find({
-        "company_id": company_id,
-        "timestamp": {
-            "$gte": datetime.combine(today_date, datetime.min.time()),
-            "$lt": datetime.combine(tomorrow_date, datetime.min.time())
-        }
-    }).to_list()
-
     # Compute compliance statuses of all for today
-    fully, partially, non = 0, 0, 0
-    violation_counts = {"helmet": 0, "vest": 0, "gloves": 0, "goggles": 0, "ear protection": 0}
+    fully, partially, non = stats.get("fully", 0), stats.get("partial", 0), stats.get("non", 0)
+    violation_counts = {item: (stats.get("violations") or {}).get(item, 0) for item in PPE_ITEMS}
 
-    total_checked = len(ppe_results)
+    total_checked = stats.get("records", 0)
     print(f"Total PPE records checked: {total_checked}")
 
-    # Handle case when no PPE records exist
     if total_checked > 0:
-        for record in ppe_results:
-            ppe = record.get("ppe_result", {})
-            if not ppe:
-                continue
-
-            detected_count = sum(1 for item, val in ppe.items() if item != "person" and val)
-            missed_count = 5 - detected_count
-
-            # Update violations per item
-            for item, val in ppe.items():
-                if item in violation_counts and not val:
-                    violation_counts[item] += 1
-
-            # Compliance classification
-            if missed_count == 0:
-                fully += 1
-            elif 1 <= missed_count <= 2:
-                partially += 1
-            else:
-                non += 1
-
-        # Calculate safety rate only when we have data
         average_safety_rate = round(((fully + partially * 0.6) / total_checked) * 100, 2)
     else:
         # No PPE records today, set default values
         average_safety_rate = 0
-        fully = partially = non = 0
-
-    print(f"Average safety rate: {average_safety_rate}")
 
     # attendance with employee info
     attendance_dict = []
     emp_map = {e["email"]: e for e in employees}
 
-    for a in attendance_today:
-        emp = emp_map.get(a["employee_email"])
-        if emp:
+    for row in employee_rows:
+        emp = emp_map.get(row["employee_email"])
+        if emp and row.get("present", 0) + row.get("absent", 0) > 0:
             attendance_dict.append({
                 "employee_id": emp["employee_id"],
                 "name": emp["name"],
                 "image_path": emp["image_path"],
-                "marked_at": a["attendance_date"],
-                "present": a["present"]
+                "marked_at": row["day"],
+                "present": row.get("present", 0) > 0
             })
 
     # employees with most violations (non-compliant)
-    non_compliant_records = [
-        rec for rec in ppe_results if rec.get("compliance_status") == "non"
-    ]
-    employee_violations = {}
-    for rec in non_compliant_records:
-        email = rec.get("employee_email")
-        if not email:
-            continue
-
-        ppe = rec.get("ppe_result", {})
-        missed = sum(1 for item, val in ppe.items() if item != "person" and not val)
-
-        if email not in employee_violations:
-            employee_violations[email] = 0
-        employee_violations[email] += missed
+    employee_violations = {
+        row["employee_email"]: row.get("non_compliant_missed", 0)
+        for row in employee_rows if row.get("non_compliant")
+    }
 
     top_non_compliant = []
-    emp_map = {e["email"]: e for e in employees}
-
     for email, violation_count in sorted(employee_violations.items(), key=lambda x: x[1], reverse=True)[:5]:
         emp = emp_map.get(email)
         if not emp:
@@ -233,18 +207,17 @@ async def view_dashboard(current_user: dict = Depends(company_required)):
     }
 
 
-def date_range(start: date, days: int) -> List[date]:
-    return [start - timedelta(days=(days - 1 - i)) for i in range(days)]
-
-
 # Convert employee doc to simple map by email
 def build_emp_map(employees: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
     return {e.get("email"): e for e in employees}
 
 
 @company_router.get("/weekly_dashboard", response_model=dict)
-async def weekly_dashboard(current_user: dict = Depends(company_required)):
-    company_id = current_user["id"]
+async def weekly_dashboard(request: Request, response: Response, current_user: dict = Depends(company_required)):
+    return await dashboard_cache.serve(request, response, current_user["id"], "weekly", build_weekly_dashboard)
+
+
+async def build_weekly_dashboard(company_id: str) -> dict:
     today = date.today()
 
     this_week_end = today
@@ -255,152 +228,47 @@ async def weekly_dashboard(current_user: dict = Depends(company_required)):
     last_week_start = last_week_end - timedelta(days=6)
     last_week_dates = [last_week_start + timedelta(days=i) for i in range(7)]
 
-    employees = await get_employees(company_id)
+    # read from the daily_stats rollup: cost follows the number of days, not raw records
+    employees, (attendance, ppe) = await asyncio.gather(
+        get_employees(company_id),
+        rollup_summary(company_id, last_week_start, this_week_end, detail_start=this_week_start),
+    )
     total_employees = len(employees)
     emp_map = build_emp_map(employees)
 
-    daily_attendance_this = []  # list of {date, present_count, absent_count, rate}
-    daily_attendance_last = []
-    daily_safety_this = []  # safety rate per day (based on PPE checked that day)
-    daily_safety_last = []
-
-    week_fully = week_partial = week_non = 0
-    week_ppe_checked = 0
-    week_violation_counts = {"helmet": 0, "vest": 0, "gloves": 0, "goggles": 0, "ear protection": 0}
-    employee_week_violations: Dict[str, int] = {}
-    employee_attendance_days: Dict[str, int] = {}
-    unique_absent_employees_set = set()
-
-    async def get_ppe_for_date(d: date) -> List[Dict[str, Any]]:
-
-        start_dt = datetime.combine(d, time.min)
-        end_dt = start_dt + timedelta(days=1)
-        cursor = ppe_col.find({
-            "company_id": company_id,
-            "timestamp": {"$gte": start_dt, "$lt": end_dt}
-        })
-        return await cursor.to_list(length=None)
-
-    async def get_attendance_for_date(d: date) -> List[Dict[str, Any]]:
-        date_str = d.isoformat()
-        cursor = attendance_col.find({
-            "company_id": company_id,
-            "attendance_date": date_str
-        })
-        return await cursor.to_list(length=None)
-
-    for d in this_week_dates:
-
-        attendance_docs = await get_attendance_for_date(d)
-        present_count = sum(1 for a in attendance_docs if a.get("present") is True)
-        absent_count = sum(1 for a in attendance_docs if a.get("present") is False)
-
-        for a in attendance_docs:
-            emp_email = a.get("employee_email")
-            if emp_email and not a.get("present"):
-                unique_absent_employees_set.add(emp_email)
-
-        for a in attendance_docs:
-            emp_email = a.get("employee_email")
-            emp_id = None
-            if emp_email and emp_map.get(emp_email):
-                emp_id = emp_map[emp_email].get("employee_id")
-
-            key = emp_id or emp_email
-            if key:
-                if a.get("present"):
-                    employee_attendance_days[key] = employee_attendance_days.get(key, 0) + 1
-                else:
-
-                    employee_attendance_days.setdefault(key, employee_attendance_days.get(key, 0))
-
-        rate = round((present_count / total_employees) * 100, 2) if total_employees > 0 else 0.0
-        daily_attendance_this.append({
-            "date": d.isoformat(),
-            "present_count": present_count,
-            "absent_count": absent_count,
-            "attendance_rate": rate
-        })
-
-        # PPE / safety calculations for day
-        ppe_docs = await get_ppe_for_date(d)
-        fully = partially = non = 0
-        checked_count = 0
-        for rec in ppe_docs:
-            ppe = rec.get("ppe_result", {}) or {}
-            if not ppe:
-                continue
-            checked_count += 1
-            detected_count = sum(1 for item, val in ppe.items() if item != "person" and val)
-            missed_count = 5 - detected_count
-
-            for item, val in ppe.items():
-                if item in week_violation_counts and not val:
-                    week_violation_counts[item] += 1
-
-            if missed_count == 0:
-                fully += 1
-            elif 1 <= missed_count <= 2:
-                partially += 1
-            else:
-                non += 1
-
-            email = rec.get("employee_email")
-            if email:
-                employee_week_violations[email] = employee_week_violations.get(email, 0) + missed_count
-
-        if checked_count == 0:
-            day_safety_rate = None
-        else:
-            day_safety_rate = round(((fully + partially * 0.6) / checked_count) * 100, 2)
-        daily_safety_this.append({
-            "date": d.isoformat(),
-            "safety_rate": day_safety_rate,
-            "checked_count": checked_count
-        })
+    def daily_attendance(dates: List[date]) -> List[Dict[str, Any]]:
+        days = []
+        for d in dates:
+            counts = attendance["daily"].get(d.isoformat(), {"present": 0, "absent": 0})
+            days.append({
+                "date": d.isoformat(),
+                "present_count": counts["present"],
+                "absent_count": counts["absent"],
+                "attendance_rate": round((counts["present"] / total_employees) * 100, 2) if total_employees > 0 else 0.0
+            })
+        return days
+
+    def daily_safety(dates: List[date]) -> List[Dict[str, Any]]:
+        days = []
+        for d in dates:
+            counts = ppe["daily"].get(d.isoformat(), {"checked": 0, "fully": 0, "partial": 0, "non": 0})
+            days.append({
+                "date": d.isoformat(),
+                "safety_rate": safety_rate(counts["fully"], counts["partial"], counts["checked"]),
+                "checked_count": counts["checked"]
+            })
+        return days
 
-        week_fully += fully
-        week_partial += partially
-        week_non += non
-        week_ppe_checked += checked_count
-
-    for d in last_week_dates:
-        attendance_docs = await get_attendance_for_date(d)
-        present_count = sum(1 for a in attendance_docs if a.get("present") is True)
-        absent_count = sum(1 for a in attendance_docs if a.get("present") is False)
-        rate = round((present_count / total_employees) * 100, 2) if total_employees > 0 else 0.0
-        daily_attendance_last.append({
-            "date": d.isoformat(),
-            "present_count": present_count,
-            "absent_count": absent_count,
-            "attendance_rate": rate
-        })
+    daily_attendance_this = daily_attendance(this_week_dates)
+    daily_attendance_last = daily_attendance(last_week_dates)
+    daily_safety_this = daily_safety(this_week_dates)
+    daily_safety_last = daily_safety(last_week_dates)
 
-        ppe_docs = await get_ppe_for_date(d)
-        fully = partially = non = 0
-        checked_count = 0
-        for rec in ppe_docs:
-            ppe = rec.get("ppe_result", {}) or {}
-            if not ppe:
-                continue
-            checked_count += 1
-            detected_count = sum(1 for item, val in ppe.items() if item != "person" and val)
-            missed_count = 5 - detected_count
-            if missed_count == 0:
-                fully += 1
-            elif 1 <= missed_count <= 2:
-                partially += 1
-            else:
-                non += 1
-        if checked_count == 0:
-            day_safety_rate = None
-        else:
-            day_safety_rate = round(((fully + partially * 0.6) / checked_count) * 100, 2)
-        daily_safety_last.append({
-            "date": d.isoformat(),
-            "safety_rate": day_safety_rate,
-            "checked_count": checked_count
-        })
+    week_days = [ppe["daily"].get(d.isoformat(), {}) for d in this_week_dates]
+    week_fully = sum(d.get("fully", 0) for d in week_days)
+    week_partial = sum(d.get("partial", 0) for d in week_days)
+    week_non = sum(d.get("non", 0) for d in week_days)
+    week_ppe_checked = sum(d.get("checked", 0) for d in week_days)
 
     attendance_rates_available = [
         d["attendance_rate"]
@@ -418,9 +286,6 @@ async def weekly_dashboard(current_user: dict = Depends(company_required)):
     else:
         average_safety_rate_week = round(((week_fully + week_partial * 0.6) / week_ppe_checked) * 100, 2)
 
-    # absent employees of this week (unique emails)
-    absent_employees_count = len(unique_absent_employees_set)
-
     # pie chart distribution for this week
     if week_ppe_checked == 0:
         fully_percent = partial_percent = non_percent = total_compliance_percent = 0
@@ -437,88 +302,41 @@ async def weekly_dashboard(current_user: dict = Depends(company_required)):
         {"name": "Non", "percent": non_percent},
     ]
 
-    # 6. Top 6 employees needing improvement
-    top6 = []
-
-    sorted_violations = sorted(employee_week_violations.items(), key=lambda x: x[1], reverse=True)[:6]
-    for email, miss_count in sorted_violations:
-        emp = emp_map.get(email, {})
-        emp_id = emp.get("employee_id") or ""
-        name = emp.get("name") or email
-
-        start_dt = datetime.combine(this_week_start, time.min)
-        end_dt = datetime.combine(this_week_end + timedelta(days=1), time.min)
-        emp_ppe_docs = await ppe_col.find({
-            "company_id": company_id,
-            "employee_email": email,
-            "timestamp": {"$gte": start_dt, "$lt": end_dt}
-        }).to_list(length=None)
-        times_checked = len(emp_ppe_docs)
-
-        max_items = max(1, times_checked * 5)
-        worn_percent = round(((max_items - miss_count) / max_items) * 100, 2) if times_checked > 0 else 0.0
-        top6.append({
-            "employee_email": email,
-            "employee_id": emp_id,
-            "name": name,
-            "violation_count": miss_count,
-            "overall_worn_percent": worn_percent
-        })
+    # Top 6 employees needing improvement (ranked and limited in the pipeline)
+    top6 = top_needing_improvement(ppe["employees"], emp_map)
 
     per_employee_attendance = []
-
     for emp in employees:
-        emp_id = emp.get("employee_id")
-        email = emp.get("email")
-        key = emp_id or email
-        days_present = employee_attendance_days.get(key, 0)
-
-        attendance_rate = round((days_present / 7) * 100, 2)
+        days_present = attendance["present_days"].get(emp.get("email"), 0)
         per_employee_attendance.append({
-            "employee_id": emp_id,
+            "employee_id": emp.get("employee_id"),
             "name": emp.get("name"),
             "days_present": days_present,
-            "attendance_rate": attendance_rate
+            "attendance_rate": round((days_present / 7) * 100, 2)
         })
     # sort descending by rate (or name)
     per_employee_attendance.sort(key=lambda x: x["attendance_rate"], reverse=True)
 
     # PPE class violations this week (bar chart)
-    ppe_class_violations = [{"item": k, "count": v} for k, v in week_violation_counts.items()]
+    ppe_class_violations = [{"item": k, "count": ppe["violations"].get(k, 0)} for k in PPE_ITEMS]
 
     # This week vs Last week attendance arrays (for chart)
     comparison_attendance = []
-    print("Daily Attendance", daily_attendance_this)
-    for i in range(7):
-        d_this = daily_attendance_this[i]
-        d_last = daily_attendance_last[i]
+    for d_this, d_last in zip(daily_attendance_this, daily_attendance_last):
         comparison_attendance.append({
             "date": d_this["date"],
             "this_week_attendance": d_this["attendance_rate"],
             "last_week_attendance": d_last["attendance_rate"]
         })
 
-    def map_dates_to_rate(daily_safety_list):
-        return {d["date"]: d["safety_rate"] for d in daily_safety_list}
-
-    safety_map_this = map_dates_to_rate(daily_safety_this)
-    safety_map_last = map_dates_to_rate(daily_safety_last)
-
     safety_comparison = []
-
-    # loop through 7 days (this week)
-    print("Safety", safety_map_this)
-    print("Daily Safety", daily_safety_this)
-    for d in this_week_dates:
-        ds = d.isoformat()
+    for d_this, d_last in zip(daily_safety_this, daily_safety_last):
         safety_comparison.append({
-            "date": ds,
-            "this_week_safety": safety_map_this.get(ds, 0) or 0,
-            "last_week_safety": safety_map_last.get((d - timedelta(days=7)).isoformat(), 0) or 0
+            "date": d_this["date"],
+            "this_week_safety": d_this["safety_rate"] or 0,
+            "last_week_safety": d_last["safety_rate"] or 0
         })
-    print("COmparison")
-    print(safety_comparison)
-    print(comparison_attendance)
+
     result = {
         "this_week": {
             "start_date": this_week_start.isoformat(),
@@ -536,7 +354,7 @@ async def weekly_dashboard(current_user: dict = Depends(company_required)):
             "total_employees": total_employees,
             "average_attendance_rate_week": avg_attendance_week,
             "average_safety_rate_week": average_safety_rate_week,
-            "unique_absent_employees_count": absent_employees_count,
+            "unique_absent_employees_count": attendance["absent_employees"],
             "ppe_checked_count_week": week_ppe_checked,
         },
         "pie_compliance_week": {
@@ -557,8 +375,11 @@ async def weekly_dashboard(current_user: dict = Depends(company_required)):
 
 
 @company_router.get("/monthly_dashboard", response_model=dict)
-async def monthly_dashboard(current_user: dict = Depends(company_required)):
-    company_id = current_user["id"]
+async def monthly_dashboard(request: Request, response: Response, current_user: dict = Depends(company_required)):
+    return await dashboard_cache.serve(request, response, current_user["id"], "monthly", build_monthly_dashboard)
+
+
+async def build_monthly_dashboard(company_id: str) -> dict:
     today = date.today()
 
     # Calculate this month's date range
@@ -568,12 +389,6 @@ async def monthly_dashboard(current_user: dict = Depends(company_required)):
     else:
         this_month_end = today.replace(month=today.month + 1, day=1) - timedelta(days=1)
 
-    this_month_dates = []
-    current_date = this_month_start
-    while current_date <= this_month_end:
-        this_month_dates.append(current_date)
-        current_date += timedelta(days=1)
-
     # Calculate last month's date range
     if this_month_start.month == 1:
         last_month_start = this_month_start.replace(year=this_month_start.year - 1, month=12)
@@ -582,140 +397,64 @@ async def monthly_dashboard(current_user: dict = Depends(company_required)):
 
     last_month_end = this_month_start - timedelta(days=1)
 
-    last_month_dates = []
-    current_date = last_month_start
-    while current_date <= last_month_end:
-        last_month_dates.append(current_date)
-        current_date += timedelta(days=1)
-
-    employees = await get_employees(company_id)
+    # read from the daily_stats rollup: cost follows the number of days, not raw records
+    employees, (attendance, ppe) = await asyncio.gather(
+        get_employees(company_id),
+        rollup_summary(company_id, last_month_start, this_month_end, detail_start=this_month_start),
+    )
     total_employees = len(employees)
     emp_map = build_emp_map(employees)
 
-    # Weekly breakdown for this month (4-5 weeks)
-    weekly_attendance_this = []  # list of {week_number, attendance_rate, present_count, absent_count}
-    weekly_attendance_last = []
-    weekly_safety_this = []  # weekly safety rates
-    weekly_safety_last = []
+    def month_weeks(start: date, end: date):
+        week_number = 1
+        week_start = start
+        while week_start <= end:
+            week_end = min(week_start + timedelta(days=6), end)
+            yield week_number, week_start, week_end, [week_start + timedelta(days=i)
+                                                      for i in range((week_end - week_start).days + 1)]
+            week_start = week_end + timedelta(days=1)
+            week_number += 1
+
+    def weekly_attendance(start: date, end: date) -> List[Dict[str, Any]]:
+        weeks = []
+        for week_number, week_start, week_end, week_dates in month_weeks(start, end):
+            days = [attendance["daily"][d.isoformat()] for d in week_dates if d.isoformat() in attendance["daily"]]
+            days = [d for d in days if d["present"] + d["absent"] > 0]
+            week_present_total = sum(d["present"] for d in days)
+            week_absent_total = sum(d["absent"] for d in days)
+
+            if days and total_employees > 0:
+                avg_daily_present = week_present_total / len(days)
+                weekly_attendance_rate = round((avg_daily_present / total_employees) * 100, 2)
+            else:
+                weekly_attendance_rate = 0.0
+
+            weeks.append({
+                "week_number": week_number,
+                "attendance_rate": weekly_attendance_rate,
+                "present_count": week_present_total,
+                "absent_count": week_absent_total,
+                "start_date": week_start.isoformat(),
+                "end_date": week_end.isoformat()
+            })
+        return weeks
+
+    weekly_attendance_this = weekly_attendance(this_month_start, this_month_end)
+    weekly_attendance_last = weekly_attendance(last_month_start, last_month_end)
 
+    weekly_safety_this = []
     month_fully = month_partial = month_non = 0
     month_ppe_checked = 0
-    month_violation_counts = {"helmet": 0, "vest": 0, "gloves": 0, "goggles": 0, "ear protection": 0}
-    employee_month_violations: Dict[str, int] = {}
-    employee_attendance_days_month: Dict[str, int] = {}
-    unique_absent_employees_set_month = set()
-
-    async def get_ppe_for_date(d: date) -> List[Dict[str, Any]]:
-        start_dt = datetime.combine(d, time.min)
-        end_dt = start_dt + timedelta(days=1)
-        cursor = ppe_col.find({
-            "company_id": company_id,
-            "timestamp": {"$gte": start_dt, "$lt": end_dt}
-        })
-        return await cursor.to_list(length=None)
-
-    async def get_attendance_for_date(d: date) -> List[Dict[str, Any]]:
-        date_str = d.isoformat()
-        cursor = attendance_col.find({
-            "company_id": company_id,
-            "attendance_date": date_str
-        })
-        return await cursor.to_list(length=None)
-
-    # Process this month data
-    current_week_start = this_month_start
-    week_number = 1
-
-    while current_week_start <= this_month_end:
-        week_end = min(current_week_start + timedelta(days=6), this_month_end)
-        week_dates = [current_week_start + timedelta(days=i) for i in range((week_end - current_week_start).days + 1)]
-
-        week_present_total = 0
-        week_absent_total = 0
-        week_days_with_data = 0
-
-        week_fully = week_partial = week_non = 0
-        week_ppe_checked = 0
-
-        for d in week_dates:
-            # Attendance data
-            attendance_docs = await get_attendance_for_date(d)
-            present_count = sum(1 for a in attendance_docs if a.get("present") is True)
-            absent_count = sum(1 for a in attendance_docs if a.get("present") is False)
-
-            for a in attendance_docs:
-                emp_email = a.get("employee_email")
-                if emp_email and not a.get("present"):
-                    unique_absent_employees_set_month.add(emp_email)
-
-            for a in attendance_docs:
-                emp_email = a.get("employee_email")
-                emp_id = None
-                if emp_email and emp_map.get(emp_email):
-                    emp_id = emp_map[emp_email].get("employee_id")
-
-                key = emp_id or emp_email
-                if key:
-                    if a.get("present"):
-                        employee_attendance_days_month[key] = employee_attendance_days_month.get(key, 0) + 1
-                    else:
-                        employee_attendance_days_month.setdefault(key, employee_attendance_days_month.get(key, 0))
-
-            if present_count + absent_count > 0:
-                week_present_total += present_count
-                week_absent_total += absent_count
-                week_days_with_data += 1
-
-            # PPE data
-            ppe_docs = await get_ppe_for_date(d)
-            for rec in ppe_docs:
-                ppe = rec.get("ppe_result", {}) or {}
-                if not ppe:
-                    continue
-                week_ppe_checked += 1
-                detected_count = sum(1 for item, val in ppe.items() if item != "person" and val)
-                missed_count = 5 - detected_count
-
-                for item, val in ppe.items():
-                    if item in month_violation_counts and not val:
-                        month_violation_counts[item] += 1
-
-                if missed_count == 0:
-                    week_fully += 1
-                elif 1 <= missed_count <= 2:
-                    week_partial += 1
-                else:
-                    week_non += 1
-
-                email = rec.get("employee_email")
-                if email:
-                    employee_month_violations[email] = employee_month_violations.get(email, 0) + missed_count
-
-        # Calculate weekly attendance rate
-        if week_days_with_data > 0 and total_employees > 0:
-            avg_daily_present = week_present_total / week_days_with_data
-            weekly_attendance_rate = round((avg_daily_present / total_employees) * 100, 2)
-        else:
-            weekly_attendance_rate = 0.0
-
-        weekly_attendance_this.append({
-            "week_number": week_number,
-            "attendance_rate": weekly_attendance_rate,
-            "present_count": week_present_total,
-            "absent_count": week_absent_total,
-            "start_date": current_week_start.isoformat(),
-            "end_date": week_end.isoformat()
-        })
-
-        # Calculate weekly safety rate
-        if week_ppe_checked > 0:
-            weekly_safety_rate = round(((week_fully + week_partial * 0.6) / week_ppe_checked) * 100, 2)
-        else:
-            weekly_safety_rate = 0.0
+    for week_number, _, _, week_dates in month_weeks(this_month_start, this_month_end):
+        days = [ppe["daily"].get(d.isoformat(), {}) for d in week_dates]
+        week_fully = sum(d.get("fully", 0) for d in days)
+        week_partial = sum(d.get("partial", 0) for d in days)
+        week_non = sum(d.get("non", 0) for d in days)
+        week_ppe_checked = sum(d.get("checked", 0) for d in days)
 
         weekly_safety_this.append({
             "week_number": week_number,
-            "safety_rate": weekly_safety_rate,
+            "safety_rate": safety_rate(week_fully, week_partial, week_ppe_checked) or 0.0,
             "checked_count": week_ppe_checked
         })
 
@@ -724,50 +463,6 @@ async def monthly_dashboard(current_user: dict = Depends(company_required)):
         month_non += week_non
         month_ppe_checked += week_ppe_checked
 
-        current_week_start = week_end + timedelta(days=1)
-        week_number += 1
-
-    # Process last month data (simplified - just weekly attendance for comparison)
-    current_week_start = last_month_start
-    week_number = 1
-
-    while current_week_start <= last_month_end:
-        week_end = min(current_week_start + timedelta(days=6), last_month_end)
-        week_dates = [current_week_start + timedelta(days=i) for i in range((week_end - current_week_start).days + 1)]
-
-        week_present_total = 0
-        week_absent_total = 0
-        week_days_with_data = 0
-
-        for d in week_dates:
-            attendance_docs = await get_attendance_for_date(d)
-            present_count = sum(1 for a in attendance_docs if a.get("present") is True)
-            absent_count = sum(1 for a in attendance_docs if a.get("present") is False)
-
-            if present_count + absent_count > 0:
-                week_present_total += present_count
-                week_absent_total += absent_count
-                week_days_with_data += 1
-
-        # Calculate weekly attendance rate for last month
-        if week_days_with_data > 0 and total_employees > 0:
-            avg_daily_present = week_present_total / week_days_with_data
-            weekly_attendance_rate = round((avg_daily_present / total_employees) * 100, 2)
-        else:
-            weekly_attendance_rate = 0.0
-
-        weekly_attendance_last.append({
-            "week_number": week_number,
-            "attendance_rate": weekly_attendance_rate,
-            "present_count": week_present_total,
-            "absent_count": week_absent_total,
-            "start_date": current_week_start.isoformat(),
-            "end_date": week_end.isoformat()
-        })
-
-        current_week_start = week_end + timedelta(days=1)
-        week_number += 1
-
     # Calculate monthly averages
     attendance_rates_available = [
         week["attendance_rate"]
@@ -786,7 +481,7 @@ async def monthly_dashboard(current_user: dict = Depends(company_required)):
         average_safety_rate_month = round(((month_fully + month_partial * 0.6) / month_ppe_checked) * 100, 2)
 
     # Unique absent employees this month
-    absent_employees_count_month = len(unique_absent_employees_set_month)
+    absent_employees_count_month = attendance["absent_employees"]
 
     # Monthly compliance distribution
     if month_ppe_checked == 0:
@@ -804,34 +499,8 @@ async def monthly_dashboard(current_user: dict = Depends(company_required)):
         {"name": "Non", "percent": non_percent},
     ]
 
-    # Top employees needing improvement for the month
-    top_month = []
-    sorted_month_violations = sorted(employee_month_violations.items(), key=lambda x: x[1], reverse=True)[:6]
-
-    for email, miss_count in sorted_month_violations:
-        emp = emp_map.get(email, {})
-        emp_id = emp.get("employee_id") or ""
-        name = emp.get("name") or email
-
-        start_dt = datetime.combine(this_month_start, time.min)
-        end_dt = datetime.combine(this_month_end + timedelta(days=1), time.min)
-        emp_ppe_docs = await ppe_col.find({
-            "company_id": company_id,
-            "employee_email": email,
-            "timestamp": {"$gte": start_dt, "$lt": end_dt}
-        }).to_list(length=None)
-        times_checked = len(emp_ppe_docs)
-
-        max_items = max(1, times_checked * 5)
-        worn_percent = round(((max_items - miss_count) / max_items) * 100, 2) if times_checked > 0 else 0.0
-
-        top_month.append({
-            "employee_email": email,
-            "employee_id": emp_id,
-            "name": name,
-            "violation_count": miss_count,
-            "overall_worn_percent": worn_percent
-        })
+    # Top employees needing improvement for the month (violation and check counts come from the same pass)
+    top_month = top_needing_improvement(ppe["employees"], emp_map)
 
     # Monthly employee attendance
     per_employee_attendance_month = []
@@ -839,9 +508,7 @@ async def monthly_dashboard(current_user: dict = Depends(company_required)):
 
     for emp in employees:
         emp_id = emp.get("employee_id")
-        email = emp.get("email")
-        key = emp_id or email
-        days_present = employee_attendance_days_month.get(key, 0)
+        days_present = attendance["present_days"].get(emp.get("email"), 0)
 
         attendance_rate = round((days_present / days_in_month) * 100, 2)
         per_employee_attendance_month.append({
@@ -855,7 +522,7 @@ async def monthly_dashboard(current_user: dict = Depends(company_required)):
     per_employee_attendance_month.sort(key=lambda x: x["attendance_rate"], reverse=True)
 
     # Monthly PPE violations
-    ppe_class_violations_month = [{"item": k, "count": v} for k, v in month_violation_counts.items()]
+    ppe_class_violations_month = [{"item": k, "count": ppe["violations"].get(k, 0)} for k in PPE_ITEMS]
 
     # Monthly comparison data (this month vs last month by week)
     attendance_comparison_month = []
@@ -1,23 +1,26 @@
-from fastapi import APIRouter, UploadFile, File, Form, Depends, HTTPException,status
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, UploadFile, File, Form, Depends, HTTPException,status, Header
 from backend.crud.company import get_info
 from backend.models.company import CompanyResponse
-from backend.crud.employee import save_employee,get_employees,get_attendance,get_employee
-from backend.crud.helper import format_embedding_result,cosine_similarity
-import numpy as np
+from backend.crud.employee import save_employee,get_employees,get_employee
+from backend.crud.daily_stats import employee_days
+from backend.crud.helper import format_embedding_result, decode_embedding
+from backend.crud.face_gallery import get_gallery, invalidate_gallery, FACE_MATCH_THRESHOLD
 from backend.crud.auth import get_user_by_email
 from backend.utils.dependencies import company_required, employee_required
 from backend.models.employee import EmployeeCreate, EmployeeResponse
 from backend.db import db
+from backend.utils.inference import run_inference
+from backend.utils.scheduler import gate_scheduler, stream_key
+from backend.utils.vision import represent_face
+from backend.utils.frame_cache import hash_frame, face_frame_cache
+from backend.utils.dashboard_cache import dashboard_cache
 import shutil
 import os
-from deepface import DeepFace
 from bson import ObjectId
 from PIL import Image
 from datetime import datetime,date, timedelta
 from collections import defaultdict
 from pydantic import BaseModel
-from fastapi.responses import JSONResponse
 
 # Directories
 UPLOAD_DIR = "employee_profiles/"
@@ -54,7 +57,7 @@ async def create_employee_api(
         shutil.copyfileobj(image.file, buffer)
 
     print(file_path)
-    raw_result = DeepFace.represent(img_path=file_path)[0]
+    raw_result = (await run_inference(represent_face, file_path))[0]
     print(raw_result)
     embedding_data = format_embedding_result(raw_result)
 
@@ -78,19 +81,37 @@ async def create_employee_api(
     success = await save_employee(employee.model_dump())
     if not success:
         raise HTTPException(status_code=500, detail="Failed to add the employee")
+    await invalidate_gallery(current_user["id"])
+    face_frame_cache.clear()
+    await dashboard_cache.invalidate(current_user["id"])
 
     return {"name": employee.name}
 
 
 @employee_router.post("/verify/")
-async def verify_employee(image: UploadFile = File(...), current_user: dict = Depends(company_required)):
+async def verify_employee(image: UploadFile = File(...), current_user: dict = Depends(company_required),
+                          x_camera_id: str = Header("default")):
     temp_path = os.path.join(FRAME_DIR, image.filename)
     print(temp_path)
     with open(temp_path, "wb") as f:
         shutil.copyfileobj(image.file, f)
 
+    # an idle gate keeps posting the same scene; reuse the last answer for near-identical frames
+    cache_key = f"{current_user['id']}:{x_camera_id}"
     try:
-        raw_results = DeepFace.represent(img_path=temp_path)
+        frame_hash = await hash_frame(temp_path)
+    except Exception as e:
+        # unreadable upload: skip the cache and let inference report it as before
+        print(f"[FrameCache] Could not hash {temp_path}: {e}")
+        frame_hash = None
+    if frame_hash is not None:
+        cached = face_frame_cache.get(cache_key, frame_hash)
+        if cached is not None:
+            return cached
+
+    try:
+        async with gate_scheduler.slot(stream_key(current_user["id"], x_camera_id)):
+            raw_results = await run_inference(represent_face, temp_path)
         if len(raw_results) > 1:
             return {
                 "status": "error",
@@ -99,29 +120,29 @@ async def verify_employee(image: UploadFile = File(...), current_user: dict = De
 
         raw_result = raw_results[0]
         embedding_data = format_embedding_result(raw_result)
-        new_embedding = np.array(embedding_data["embedding"])
+        new_embedding = decode_embedding(embedding_data["embedding"])
         facial_area = embedding_data["facial_area"]
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Face not detected: {str(e)}")
 
-    employees = await get_employees(current_user["id"])
-    if not employees:
-        return {"status": "No employees in database"}
+    gallery = await get_gallery(current_user["id"])
+    if not len(gallery):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Employees with this company had not been placed!")
 
     best_match = None
     best_score = -1  # cosine similarity (higher is better)
-    threshold = 0.35
+    threshold = FACE_MATCH_THRESHOLD
 
-    for emp in employees:
-        stored_embedding = np.array(emp["embedding"])
-        score = cosine_similarity(stored_embedding, new_embedding)
-        if score > best_score:
-            best_score = score
-            best_match = emp
+    matches = gallery.search(new_embedding, k=1)
+    if matches:
+        best_row, best_score = matches[0]
+        best_match = gallery.metadata[best_row]
 
     if best_score > threshold:
 
-        return {
+        result = {
             "status": "Identified",
             "employee_id": best_match["employee_id"],
             "name": best_match["name"],
@@ -130,7 +151,11 @@ async def verify_employee(image: UploadFile = File(...), current_user: dict = De
             "facial_area": facial_area
         }
     else:
-        return {"status": "Not Identified", "facial_area": facial_area}
+        result = {"status": "Not Identified", "facial_area": facial_area}
+
+    if frame_hash is not None:
+        face_frame_cache.put(cache_key, frame_hash, result)
+    return result
 
 
 # ----------------------------
@@ -165,6 +190,9 @@ async def delete_employee(employee_id: str):
     success = await delete_employee_db(employee_id)
     if not success:
         raise HTTPException(status_code=404, detail="Employee not found or deletion failed")
+    await invalidate_gallery()
+    face_frame_cache.clear()
+    await dashboard_cache.clear()
 
     return {"status": "Employee deleted successfully"}
 
@@ -189,7 +217,7 @@ async def update_employee(
         with open(file_path, "wb") as buffer:
             shutil.copyfileobj(image.file, buffer)
 
-        raw_result = DeepFace.represent(img_path=file_path)[0]
+        raw_result = (await run_inference(represent_face, file_path))[0]
         embedding_data = format_embedding_result(raw_result)
 
         update_data.update({
@@ -206,6 +234,9 @@ async def update_employee(
     success = await update_employee_db(employee_id, update_data)
     if not success:
         raise HTTPException(status_code=404, detail="Employee not found or update failed")
+    await invalidate_gallery()
+    face_frame_cache.clear()
+    await dashboard_cache.clear()
 
     return {"status": "Employee updated successfully"}
 
@@ -285,23 +316,20 @@ async def dashboard(current_user: dict = Depends(employee_required)):
         else:
             end_of_month = datetime(now.year + 1, 1, 1)
 
-        start_str = start_of_month.strftime("%Y-%m-%d")
-        end_str = end_of_month.strftime("%Y-%m-%d")
-
-        attendances = await attendance_col.find({
-            "employee_email": employee.email,
-            "attendance_date": {"$gte": start_str, "$lt": end_str}
-        }).to_list(length=None)
+        # the month's attendance and PPE tallies come from the employee's daily_stats rows
+        month_rows = await employee_days(start_of_month.date(), (end_of_month - timedelta(days=1)).date(),
+                                         email=employee.email)
 
+        attendances = [r for r in month_rows if r.get("present", 0) + r.get("absent", 0) > 0]
         attendance_list = [
             {
-                "date": a["attendance_date"],
-                "present": a.get("present", False)
+                "date": r["day"],
+                "present": r.get("present", 0) > 0
             }
-            for a in attendances
+            for r in attendances
         ]
-        present_days = [a for a in attendances if a.get("present", False)]
-        absent_days = [a for a in attendances if not a.get("present", False)]
+        present_days = [a for a in attendance_list if a["present"]]
+        absent_days = [a for a in attendance_list if not a["present"]]
 
         total_days = len(attendances)
         monthly_average_attendance = round((len(present_days) / total_days) * 100, 2) if total_days > 0 else 0
@@ -312,9 +340,8 @@ async def dashboard(current_user: dict = Depends(employee_required)):
         today_str = date.today().isoformat()
         today_attendance = next((a for a in attendance_list if a["date"] == today_str), None)
 
-        if not today_attendance and attendances:
-            attendances_sorted = sorted(attendances, key=lambda x: x["attendance_date"], reverse=True)
-            today_attendance = attendances_sorted[0]
+        if not today_attendance and attendance_list:
+            today_attendance = max(attendance_list, key=lambda x: x["date"])
 
         today_date = datetime.utcnow().date()
         tomorrow_date = today_date + timedelta(days=1)
@@ -342,12 +369,6 @@ async def dashboard(current_user: dict = Depends(employee_required)):
 
         print(ppe_bar_chart)
 
-        # Collect all PPE results for the month
-        ppe_results_list = await ppe_col.find({
-            "employee_email": employee.email,
-            "timestamp": {"$gte": start_of_month, "$lt": end_of_month}
-        }).to_list(length=None)
-
         weekly_data = defaultdict(lambda: {
             "violations": 0,
             "missed_items_count": defaultdict(int),
@@ -355,20 +376,17 @@ async def dashboard(current_user: dict = Depends(employee_required)):
             "days_count": 0
         })
 
-        for record in ppe_results_list:
-            ts = record["timestamp"]
-            week_num = ts.isocalendar()[1]
-
-            weekly_data[week_num]["days_count"] += 1
-
-            for item, status in record["ppe_result"].items():
-                if item == "person":
-                    continue
-                if not status:
-                    weekly_data[week_num]["violations"] += 1
-                    weekly_data[week_num]["missed_items_count"][item] += 1
-                else:
-                    weekly_data[week_num]["true_count"][item] += 1
+        for row in month_rows:
+            if not row.get("records"):
+                continue
+            week_num = date.fromisoformat(row["day"]).isocalendar()[1]
+
+            weekly_data[week_num]["days_count"] += row["records"]
+            for item, count in (row.get("violations") or {}).items():
+                weekly_data[week_num]["violations"] += count
+                weekly_data[week_num]["missed_items_count"][item] += count
+            for item, count in (row.get("worn") or {}).items():
+                weekly_data[week_num]["true_count"][item] += count
 
         weekly_summary = {}
 
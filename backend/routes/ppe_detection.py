@@ -1,18 +1,30 @@
-from fastapi import APIRouter, Depends
-import base64, io, json, time, uuid, redis
+from fastapi import APIRouter, Depends, Request, WebSocket, WebSocketDisconnect, Query, HTTPException, status, \
+    UploadFile, File, Form, Header, BackgroundTasks
+from typing import List
+import asyncio, json, os, shutil, tempfile, time, uuid
 from backend.utils.dependencies import company_required
-from ultralytics import YOLO
-from PIL import Image
-from backend.models.employee import Attendance
-from backend.crud.employee import marked_attended
-from backend.models.detect import DetectRequest, StartSessionRequest
-from backend.crud.ppe_detect import save_ppe_record
+from backend.utils.authentication import decode_jwt_token
+from backend.models.detect import StartSessionRequest
+from backend.crud.ppe_detect import finalize_ppe_check
+from backend.crud.ppe_audit import create_audit, get_audit, run_audit_job
+from backend.config import PPEModelConfig, AuditConfig
+from backend.utils.batching import MicroBatcher
+from backend.utils.frames import read_frame_request, decode_bytes, decode_data_url, decode_file, FrameError, \
+    sample_indices, sample_video_frames
+from backend.utils.inference import run_inference
+from backend.utils.vision import detect_ppe_frames, load_rgb, represent_face_image
+from backend.crud.face_gallery import identify
+from backend.utils.preprocess import next_roi
+from backend.utils.grouping import group_by_person
+from backend.utils.frame_cache import hash_frame, ppe_frame_cache
+from backend.utils.session_store import create_session_store, format_box
+from backend.utils.scheduler import gate_scheduler, stream_key
 
 PPE_CLASSES = ["helmet", "gloves", "vest", "goggles", "ear protection", "person"]
 detect_router = APIRouter(prefix="/detect")
 
-model = YOLO("backend/routes/best.pt")
-r = redis.Redis(decode_responses=True)
+session_store = create_session_store()
+ppe_batcher = MicroBatcher(detect_ppe_frames, PPEModelConfig.MAX_BATCH, PPEModelConfig.MAX_WAIT_MS)
 
 STABLE_THRESHOLD = {"helmet": 1, "gloves": 1, "vest": 1, "goggles": 1, "ear protection": 1, "person": 1}
 MAX_ROUNDS = 6
@@ -20,61 +32,51 @@ NO_PERSON_LIMIT = 3
 EARLY_MISSING_CHECK_ROUNDS = 4
 
 
-@detect_router.post("/start_session")
-def start_session(req: StartSessionRequest):
-    session_id = str(uuid.uuid4())
-    session = {
-        "person_id": req.person_id,
+def new_session(person_id: str) -> dict:
+    return {
+        "person_id": person_id,
         "rounds": 0,
         "detections_count": {cls: 0 for cls in PPE_CLASSES},
         "ppe_status": {cls: False for cls in PPE_CLASSES},
         "no_person_count": 0,
         "last_seen_time": time.time(),
+        "roi": None,
+        "person_box": None,
     }
-    print(session)
-    print("Hi")
-    r.set(f"session:{session_id}", json.dumps(session), ex=60 * 5)
-    return {"session_id": session_id, "message": "Session started successfully."}
-
 
-@detect_router.post("/ppe_detect")
-async def detect(req: DetectRequest, current_user: dict = Depends(company_required)):
-    key = f"session:{req.session_id}"
-    data = r.get(key)
-    if not data:
-        return {"error": "Session expired or invalid."}
-    session = json.loads(data)
 
-    # Decode image
-    try:
-        img_data = base64.b64decode(req.image.split(",")[1])
-    except Exception:
-        return {"error": "Invalid image format."}
-    image = Image.open(io.BytesIO(img_data))
+async def run_ppe_round(image, session: dict):
+    """Detect PPE on one frame, cropped to the session's person ROI if it has one."""
+    frame_size = image.size
+    roi = session.get("roi") if PPEModelConfig.ROI_ENABLED else None
+    detections = await ppe_batcher.submit((image, roi))
+    if PPEModelConfig.ROI_ENABLED:
+        return detections, next_roi(detections, frame_size, roi, session.get("person_box"))
+    return detections, (None, None)
 
-    # Run detection
-    results = model(image, conf=0.25)
-    boxes = results[0].boxes
-    detected_classes = {model.names[int(b.cls)] for b in boxes}
 
-    finalize = False
-    # Count detections
+# ----------------------------
+# Session round logic, shared by the HTTP and WebSocket flows
+# ----------------------------
+def count_detections(session: dict, detected_classes: set):
     for cls in detected_classes:
         if cls in session["detections_count"]:
             session["detections_count"][cls] += 1
 
     session["rounds"] += 1
 
+
+def evaluate_session(session: dict):
     # Mark stable items
+    session.setdefault("ppe_status", {cls: False for cls in PPE_CLASSES})
     for cls in PPE_CLASSES:
-        if session["detections_count"][cls] >= STABLE_THRESHOLD[cls]:
+        if session["detections_count"].get(cls, 0) >= STABLE_THRESHOLD[cls]:
             session["ppe_status"][cls] = True
 
     missing = [k for k, v in session["ppe_status"].items() if not v and k != "person"]
 
     finalize = False
     prompt = ""
-    points_today = 0  # Initialize points
 
     # All items stable → stop immediately
     if all(session["ppe_status"].values()):
@@ -98,55 +100,410 @@ async def detect(req: DetectRequest, current_user: dict = Depends(company_requir
             if not missing
             else f"⚠️ Missing items: {', '.join(missing)}"
         )
-    if finalize:
-        total_ppe = ["helmet", "vest", "gloves", "goggles", "ear_protection"]
-        detected_count = sum(1 for k in total_ppe if session["ppe_status"].get(k))
-        points_today = detected_count * 20
-        missing_count = len(total_ppe) - detected_count
-        compliance_status = "non"
-        if missing_count == 0:
-            compliance_status = "fully"
-        elif 1 <= missing_count <= 2:
-            compliance_status = "partially"
-        else:
-            compliance_status = "non"
-        result = await save_ppe_record(session["person_id"], current_user["id"], session["ppe_status"], points_today,
-                                       compliance_status)
-        emp = Attendance(
-            employee_email=session["person_id"],
-            company_id=current_user["id"],
-            present=True)
-        print(emp)
-        result_att = await marked_attended(emp)
-        if result_att:
-            print("Sucess Inserting")
-        else:
-            print("Error Inserting")
-        if result:
-            print(f"[DB] PPE record saved for {session['person_id']} ({points_today} pts)")
-        else:
-            print("[DB] Error saving PPE record.")
-
-        r.delete(key)
     else:
         # Continue detection session
         prompt = f"Please show your {missing[0]} clearly." if missing else "Hold still, verifying detection stability..."
-        r.set(key, json.dumps(session), ex=60 * 5)
 
+    return finalize, prompt, missing
+
+
+def advance_session(session: dict, detected_classes: set):
+    count_detections(session, detected_classes)
+    return evaluate_session(session)
+
+
+async def finalize_session(session: dict, company_id: str) -> int:
+    total_ppe = ["helmet", "vest", "gloves", "goggles", "ear_protection"]
+    detected_count = sum(1 for k in total_ppe if session["ppe_status"].get(k))
+    points_today = detected_count * 20
+    missing_count = len(total_ppe) - detected_count
+    compliance_status = "non"
+    if missing_count == 0:
+        compliance_status = "fully"
+    elif 1 <= missing_count <= 2:
+        compliance_status = "partially"
+    else:
+        compliance_status = "non"
+    # record insert, $inc of points and attendance upsert go out together
+    await finalize_ppe_check(session["person_id"], company_id, session["ppe_status"], points_today,
+                             compliance_status)
+    return points_today
+
+
+def session_response(session: dict, prompt: str, missing: list, detections: list, finalize: bool,
+                     points_today: int) -> dict:
     return {
         "prompt": prompt,
         "ppe_status": session["ppe_status"],
         "missing_items": missing,
         "rounds": session["rounds"],
-        "detections": [
-            {
-                "class": model.names[int(b.cls)],
-                "confidence": float(b.conf),
-                "bbox": b.xyxy[0].tolist(),
-            }
-            for b in boxes
-        ],
+        "detections": detections,
         "finalize": finalize,
         "points": points_today,  # Add points to response
         "person_info": session.get("person_info", {})  # Include person info if available
-    }
\ No newline at end of file
+    }
+
+
+@detect_router.post("/start_session")
+async def start_session(req: StartSessionRequest):
+    session_id = str(uuid.uuid4())
+    await session_store.create(session_id, req.person_id, PPE_CLASSES)
+    print(f"[Session] {session_id} started for {req.person_id}")
+    return {"session_id": session_id, "message": "Session started successfully."}
+
+
+@detect_router.post("/ppe_detect")
+async def detect(request: Request, current_user: dict = Depends(company_required)):
+    # Accepts the original JSON body (DetectRequest with a base64 data URL), a multipart
+    # upload with `image` and `session_id` fields, or a raw JPEG/PNG body with
+    # ?session_id=... (or an X-Session-Id header).
+    try:
+        image, fields = await read_frame_request(request)
+    except FrameError as e:
+        return {"error": str(e)}
+    session_id = fields.get("session_id")
+    if not session_id:
+        return {"error": "Missing session_id."}
+
+    # don't spend an inference pass on a stale session
+    session = await session_store.get(session_id)
+    if session is None:
+        return {"error": "Session expired or invalid."}
+
+    # Run detection, unless this frame is a near-duplicate of the session's previous one
+    frame_hash = await hash_frame(image)
+    cached = ppe_frame_cache.get(session_id, frame_hash)
+    if cached is not None:
+        detections, roi, person_box = cached
+    else:
+        async with gate_scheduler.slot(stream_key(current_user["id"], request.headers.get("x-camera-id"))):
+            detections, (roi, person_box) = await run_ppe_round(image, session)
+        ppe_frame_cache.put(session_id, frame_hash, (detections, roi, person_box))
+    detected_classes = {d["class"] for d in detections} & set(PPE_CLASSES)
+
+    # counters are bumped atomically server-side, so concurrent frames can't lose updates
+    session = await session_store.record_round(session_id, detected_classes,
+                                               {"roi": format_box(roi), "person_box": format_box(person_box)})
+    if session is None:
+        return {"error": "Session expired or invalid."}
+
+    finalize, prompt, missing = evaluate_session(session)
+    points_today = 0  # Initialize points
+
+    # only the request that removes the session persists it, so a check is saved once
+    if finalize and await session_store.delete(session_id):
+        ppe_frame_cache.invalidate(session_id)
+        points_today = await finalize_session(session, current_user["id"])
+
+    return session_response(session, prompt, missing, detections, finalize, points_today)
+
+
+# ----------------------------
+# Combined face identification + PPE check
+# ----------------------------
+def checkin_session_id(company_id: str, email: str) -> str:
+    return f"checkin:{company_id}:{email}"
+
+
+def largest_face(faces: list) -> dict:
+    return max(faces, key=lambda f: f["facial_area"]["w"] * f["facial_area"]["h"])
+
+
+@detect_router.post("/checkin")
+async def checkin(request: Request, current_user: dict = Depends(company_required)):
+    """
+    One frame, both pipelines: the frame is decoded once, face identification and
+    PPE detection run concurrently on it, and the PPE session of the identified
+    employee is started or advanced. Accepts the same encodings as /detect/ppe_detect;
+    send back the returned `session_id` so later frames can reuse the person ROI.
+    """
+    try:
+        image, fields = await read_frame_request(request)
+    except FrameError as e:
+        return {"error": str(e)}
+
+    company_id = current_user["id"]
+    session_id = fields.get("session_id") or ""
+    session = None
+    if session_id.startswith(checkin_session_id(company_id, "")):
+        session = await session_store.get(session_id)
+
+    async with gate_scheduler.slot(stream_key(company_id, request.headers.get("x-camera-id"))):
+        image = await run_inference(load_rgb, image)
+        faces, ppe_round = await asyncio.gather(
+            run_inference(represent_face_image, image),
+            run_ppe_round(image, session or {}),
+            return_exceptions=True,
+        )
+    if isinstance(ppe_round, Exception):
+        raise ppe_round
+    if isinstance(faces, HTTPException):
+        raise faces
+    detections, (roi, person_box) = ppe_round
+
+    if isinstance(faces, Exception) or not faces:
+        return {"status": "Not Identified", "message": "Face not detected", "detections": detections}
+
+    face = largest_face(faces)
+    match = await identify(company_id, face["embedding"])
+    if match is None:
+        return {"status": "Not Identified", "facial_area": face["facial_area"], "detections": detections}
+    employee, score = match
+
+    session_id = checkin_session_id(company_id, employee["email"])
+    await session_store.create(session_id, employee["email"], PPE_CLASSES, if_absent=True)
+    detected_classes = {d["class"] for d in detections} & set(PPE_CLASSES)
+    session = await session_store.record_round(session_id, detected_classes,
+                                               {"roi": format_box(roi), "person_box": format_box(person_box)})
+    if session is None:
+        return {"error": "Session expired or invalid."}
+
+    finalize, prompt, missing = evaluate_session(session)
+    points_today = 0
+    if finalize and await session_store.delete(session_id):
+        points_today = await finalize_session(session, company_id)
+
+    response = session_response(session, prompt, missing, detections, finalize, points_today)
+    response.update({
+        "status": "Identified",
+        "session_id": session_id,
+        "employee_id": employee["employee_id"],
+        "name": employee["name"],
+        "email": employee["email"],
+        "image_path": employee["image_path"],
+        "facial_area": face["facial_area"],
+        "similarity": score,
+    })
+    return response
+
+
+# ----------------------------
+# Multi-person check
+# ----------------------------
+@detect_router.post("/group_check")
+async def group_check(request: Request, current_user: dict = Depends(company_required)):
+    """
+    Check everyone in the frame at once. PPE boxes and faces are associated with
+    each detected person; every recognised employee gets their own PPE session
+    (the same one /detect/checkin uses) which advances and finalizes independently.
+    """
+    try:
+        image, _ = await read_frame_request(request)
+    except FrameError as e:
+        return {"error": str(e)}
+
+    company_id = current_user["id"]
+    async with gate_scheduler.slot(stream_key(company_id, request.headers.get("x-camera-id"))):
+        image = await run_inference(load_rgb, image)
+        faces, detections = await asyncio.gather(
+            run_inference(represent_face_image, image, enforce_detection=False),
+            ppe_batcher.submit((image, None)),
+            return_exceptions=True,
+        )
+    if isinstance(detections, Exception):
+        raise detections
+    if isinstance(faces, HTTPException):
+        raise faces
+    if isinstance(faces, Exception):
+        faces = []
+    # with enforce_detection off DeepFace returns the whole frame when it finds no face
+    faces = [f for f in faces if f.get("face_confidence", 1) > 0]
+
+    # identify each person's face; if one employee matches twice keep the better match
+    identified = {}
+    unidentified = 0
+    for group in group_by_person(detections, faces):
+        match = await identify(company_id, group["face"]["embedding"]) if group["face"] else None
+        if match is None:
+            unidentified += 1
+            continue
+        employee, score = match
+        current = identified.get(employee["email"])
+        if current is None or score > current[2]:
+            identified[employee["email"]] = (employee, group, score)
+
+    people = []
+    for email, (employee, group, score) in identified.items():
+        session_id = checkin_session_id(company_id, email)
+        await session_store.create(session_id, email, PPE_CLASSES, if_absent=True)
+        detected_classes = {"person"} | ({d["class"] for d in group["items"]} & set(PPE_CLASSES))
+        session = await session_store.record_round(session_id, detected_classes)
+        if session is None:
+            continue
+
+        finalize, prompt, missing = evaluate_session(session)
+        points_today = 0
+        if finalize and await session_store.delete(session_id):
+            points_today = await finalize_session(session, company_id)
+
+        result = session_response(session, prompt, missing, [group["person"], *group["items"]], finalize,
+                                  points_today)
+        result.update({
+            "session_id": session_id,
+            "employee_id": employee["employee_id"],
+            "name": employee["name"],
+            "email": email,
+            "facial_area": group["face"]["facial_area"],
+            "similarity": score,
+        })
+        people.append(result)
+
+    return {
+        "people": people,
+        "unidentified_count": unidentified,
+        "detections": detections,
+    }
+
+
+# ----------------------------
+# Single-request clip check
+# ----------------------------
+@detect_router.post("/ppe_clip")
+async def detect_clip(
+        person_id: str = Form(...),
+        frames: List[UploadFile] = File(None),
+        video: UploadFile = File(None),
+        current_user: dict = Depends(company_required),
+        x_camera_id: str = Header(None)
+):
+    """
+    Run a whole PPE check from one upload: either a burst of `frames` images or a
+    short `video` clip. Up to MAX_ROUNDS frames are sampled, detected in one batch
+    and fed through the same round logic as /detect/ppe_detect; the check is always
+    finalized in this request.
+    """
+    key = stream_key(current_user["id"], x_camera_id)
+    if video is not None:
+        suffix = os.path.splitext(video.filename or "")[1] or ".mp4"
+        with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as buffer:
+            shutil.copyfileobj(video.file, buffer)
+        try:
+            async with gate_scheduler.slot(key):
+                images = await run_inference(sample_video_frames, buffer.name, MAX_ROUNDS)
+        finally:
+            os.remove(buffer.name)
+    elif frames:
+        try:
+            images = [decode_file(frames[i].file) for i in sample_indices(len(frames), MAX_ROUNDS)]
+        except FrameError as e:
+            return {"error": str(e)}
+    else:
+        return {"error": "Upload either frames or a video clip."}
+
+    if not images:
+        return {"error": "No readable frames in upload."}
+
+    async with gate_scheduler.slot(key):
+        batch_detections = await run_inference(detect_ppe_frames, [(image, None) for image in images])
+
+    session = new_session(person_id)
+    finalize, prompt, missing = False, "", []
+    for detections in batch_detections:
+        finalize, prompt, missing = advance_session(session, {d["class"] for d in detections})
+        if finalize:
+            break
+
+    # the clip is all we get, so settle with whatever was confirmed
+    if not finalize:
+        finalize = True
+        prompt = "✅ All PPE detected successfully!" if not missing else f"⚠️ Missing items: {', '.join(missing)}"
+
+    points_today = await finalize_session(session, current_user["id"])
+    response = session_response(session, prompt, missing, batch_detections[session["rounds"] - 1], finalize,
+                                points_today)
+    response["frames_analyzed"] = session["rounds"]
+    return response
+
+
+# ----------------------------
+# Offline video audit
+# ----------------------------
+@detect_router.post("/audit")
+async def start_audit(
+        background_tasks: BackgroundTasks,
+        video: UploadFile = File(...),
+        sample_fps: float = Form(AuditConfig.SAMPLE_FPS),
+        window_sec: float = Form(AuditConfig.WINDOW_SEC),
+        current_user: dict = Depends(company_required)
+):
+    """Queue a recorded video for a PPE compliance audit; poll /detect/audit/{audit_id} for results."""
+    if sample_fps <= 0 or window_sec <= 0:
+        raise HTTPException(status_code=400, detail="sample_fps and window_sec must be positive")
+
+    suffix = os.path.splitext(video.filename or "")[1] or ".mp4"
+    with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as buffer:
+        await asyncio.to_thread(shutil.copyfileobj, video.file, buffer)
+
+    audit_id = await create_audit(current_user["id"], video.filename, sample_fps, window_sec)
+    background_tasks.add_task(run_audit_job, audit_id, current_user["id"], buffer.name, sample_fps, window_sec,
+                              remove_file=True)
+    return {"audit_id": audit_id, "status": "queued"}
+
+
+@detect_router.get("/audit/{audit_id}")
+async def audit_status(audit_id: str, current_user: dict = Depends(company_required)):
+    audit = await get_audit(audit_id, current_user["id"])
+    if audit is None:
+        raise HTTPException(status_code=404, detail="Audit not found")
+    return audit
+
+
+# ----------------------------
+# WebSocket streaming session
+# ----------------------------
+@detect_router.websocket("/ws")
+async def detect_stream(websocket: WebSocket, token: str = Query(...), person_id: str = Query(...),
+                        camera_id: str = Query(None)):
+    """
+    One connection per gate check: the client streams frames (binary JPEG/PNG
+    messages, or text messages holding a base64 data URL or {"image": ...}) and
+    receives the same payload as /detect/ppe_detect after every frame. Session
+    state lives in memory until the check is finalized.
+    """
+    try:
+        current_user = decode_jwt_token(token)
+    except HTTPException:
+        current_user = None
+    if not current_user or current_user.get("role") != "company":
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    await websocket.accept()
+    key = stream_key(current_user["id"], camera_id)
+    session = new_session(person_id)
+    await websocket.send_json({"message": "Session started successfully.", "rounds": 0})
+
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+
+            try:
+                if message.get("bytes") is not None:
+                    image = decode_bytes(message["bytes"])
+                else:
+                    text = message.get("text") or ""
+                    if text.lstrip().startswith("{"):
+                        text = json.loads(text).get("image", "")
+                    image = decode_data_url(text)
+            except (FrameError, ValueError, AttributeError):
+                await websocket.send_json({"error": "Invalid image format."})
+                continue
+
+            try:
+                async with gate_scheduler.slot(key):
+                    detections, (session["roi"], session["person_box"]) = await run_ppe_round(image, session)
+            except HTTPException as e:
+                # shed this frame; the gate keeps streaming and tries again
+                await websocket.send_json({"error": e.detail, "retry_after": (e.headers or {}).get("Retry-After")})
+                continue
+            finalize, prompt, missing = advance_session(session, {d["class"] for d in detections})
+            points_today = await finalize_session(session, current_user["id"]) if finalize else 0
+            await websocket.send_json(session_response(session, prompt, missing, detections, finalize,
+                                                       points_today))
+            if finalize:
+                await websocket.close()
+                break
+    except WebSocketDisconnect:
+        print(f"[WS] Gate disconnected before finalizing {person_id}")
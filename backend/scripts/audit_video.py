@@ -0,0 +1,46 @@
+"""
+Audit a recorded video for PPE compliance and print one JSON line per time window.
+
+    python -m backend.scripts.audit_video footage.mp4 --fps 2 --window 60
+    python -m backend.scripts.audit_video footage.mp4 --company-id <id>   # also store the audit in Mongo
+"""
+import argparse
+import asyncio
+import json
+import os
+from backend.config import AuditConfig
+from backend.utils.video_audit import audit_video, summarize
+
+
+async def store(company_id: str, source: str, sample_fps: float, window_sec: float, windows: list):
+    from backend.crud.ppe_audit import create_audit, finish_audit, save_audit_window
+
+    audit_id = await create_audit(company_id, source, sample_fps, window_sec)
+    for window in windows:
+        await save_audit_window(audit_id, company_id, window)
+    await finish_audit(audit_id, summarize(windows))
+    return audit_id
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("video")
+    parser.add_argument("--fps", type=float, default=AuditConfig.SAMPLE_FPS, help="frames sampled per second")
+    parser.add_argument("--window", type=float, default=AuditConfig.WINDOW_SEC, help="window length in seconds")
+    parser.add_argument("--batch", type=int, default=AuditConfig.BATCH)
+    parser.add_argument("--company-id", help="store the audit and its windows for this company")
+    args = parser.parse_args()
+
+    windows = []
+    for window in audit_video(args.video, args.fps, args.window, args.batch):
+        print(json.dumps(window))
+        if args.company_id:
+            windows.append(window)
+
+    if args.company_id:
+        audit_id = asyncio.run(store(args.company_id, os.path.basename(args.video), args.fps, args.window, windows))
+        print(f"Stored audit {audit_id}")
+
+
+if __name__ == "__main__":
+    main()
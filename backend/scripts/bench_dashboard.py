@@ -0,0 +1,177 @@
+"""
+Benchmark the company dashboards against a seeded dataset: Mongo round trips,
+bytes returned and latency, for the daily_stats-backed builders versus the
+per-day query pattern they replaced.
+
+    python -m backend.scripts.bench_dashboard --seed --employees 500 --days 62
+    python -m backend.scripts.bench_dashboard --runs 10
+    python -m backend.scripts.bench_dashboard --cleanup
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time as clock
+from datetime import date, datetime, time, timedelta
+import bson
+from pymongo import monitoring
+
+BENCH_COMPANY = "bench-company"
+ITEMS = ["helmet", "gloves", "vest", "goggles", "ear protection", "person"]
+
+
+class CommandCounter(monitoring.CommandListener):
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.commands = 0
+        self.reply_bytes = 0
+
+    def started(self, event):
+        if event.command_name in ("find", "getMore", "aggregate", "count", "countDocuments"):
+            self.commands += 1
+
+    def succeeded(self, event):
+        if event.command_name in ("find", "getMore", "aggregate"):
+            self.reply_bytes += len(bson.encode(event.reply))
+
+    def failed(self, event):
+        pass
+
+
+# must be registered before backend.db creates the client
+counter = CommandCounter()
+monitoring.register(counter)
+
+from backend.db import db  # noqa: E402
+from backend.crud.daily_stats import daily_stats_col, rebuild_daily_stats  # noqa: E402
+from backend.routes.company import build_weekly_dashboard, build_monthly_dashboard  # noqa: E402
+
+employee_col = db["employee"]
+attendance_col = db["attendance"]
+ppe_col = db["ppe_records"]
+
+
+async def seed(employees: int, days: int):
+    await cleanup()
+    rng = random.Random(0)
+    today = date.today()
+    await employee_col.insert_many([
+        {"employee_id": f"B{i:05d}", "name": f"Bench {i}", "email": f"bench{i}@example.com",
+         "company_id": BENCH_COMPANY, "point_total": 0}
+        for i in range(employees)
+    ])
+    for back in range(days):
+        d = today - timedelta(days=back)
+        attendance, records = [], []
+        for i in range(employees):
+            email = f"bench{i}@example.com"
+            attendance.append({"employee_email": email, "company_id": BENCH_COMPANY,
+                               "present": rng.random() < 0.85, "attendance_date": d.isoformat()})
+            if rng.random() < 0.8:
+                result = {item: rng.random() < 0.8 for item in ITEMS}
+                records.append({"employee_email": email, "company_id": BENCH_COMPANY, "ppe_result": result,
+                                "timestamp": datetime.combine(d, time(8)) + timedelta(seconds=rng.randint(0, 7200)),
+                                "today_points": 20 * sum(result[i] for i in ITEMS[:5]),
+                                "compliance_status": "partially"})
+        await attendance_col.insert_many(attendance)
+        if records:
+            await ppe_col.insert_many(records)
+    # nothing else writes the bench company, so today can be rebuilt too
+    await rebuild_daily_stats(BENCH_COMPANY, include_today=True)
+    print(f"Seeded {employees} employees over {days} days for {BENCH_COMPANY}")
+
+
+async def cleanup():
+    for col in (employee_col, attendance_col, ppe_col, daily_stats_col):
+        await col.delete_many({"company_id": BENCH_COMPANY})
+
+
+async def legacy_weekly():
+    """The reads the per-day weekly dashboard issued: 14 days x 2 finds, then one find per top-6 employee."""
+    today = date.today()
+    await employee_col.find({"company_id": BENCH_COMPANY}, {"embedding": 0}).to_list(length=None)
+    violations = {}
+    for back in range(13, -1, -1):
+        d = today - timedelta(days=back)
+        await attendance_col.find({"company_id": BENCH_COMPANY, "attendance_date": d.isoformat()}).to_list(length=None)
+        docs = await ppe_col.find({"company_id": BENCH_COMPANY, "timestamp": {
+            "$gte": datetime.combine(d, time.min), "$lt": datetime.combine(d + timedelta(days=1), time.min)}}
+        ).to_list(length=None)
+        if back < 7:
+            for rec in docs:
+                missed = 5 - sum(1 for k, v in (rec.get("ppe_result") or {}).items() if k != "person" and v)
+                violations[rec["employee_email"]] = violations.get(rec["employee_email"], 0) + missed
+    start = datetime.combine(today - timedelta(days=6), time.min)
+    for email, _ in sorted(violations.items(), key=lambda x: x[1], reverse=True)[:6]:
+        await ppe_col.find({"company_id": BENCH_COMPANY, "employee_email": email,
+                            "timestamp": {"$gte": start}}).to_list(length=None)
+
+
+async def legacy_monthly():
+    """The reads the per-day monthly dashboard issued: every day of both months, then one find per top employee."""
+    today = date.today()
+    this_month_start = today.replace(day=1)
+    last_month_start = (this_month_start - timedelta(days=1)).replace(day=1)
+    next_month = (this_month_start + timedelta(days=32)).replace(day=1)
+    await employee_col.find({"company_id": BENCH_COMPANY}, {"embedding": 0}).to_list(length=None)
+    violations = {}
+    d = last_month_start
+    while d < next_month:
+        await attendance_col.find({"company_id": BENCH_COMPANY, "attendance_date": d.isoformat()}).to_list(length=None)
+        if d >= this_month_start:
+            docs = await ppe_col.find({"company_id": BENCH_COMPANY, "timestamp": {
+                "$gte": datetime.combine(d, time.min), "$lt": datetime.combine(d + timedelta(days=1), time.min)}}
+            ).to_list(length=None)
+            for rec in docs:
+                missed = 5 - sum(1 for k, v in (rec.get("ppe_result") or {}).items() if k != "person" and v)
+                violations[rec["employee_email"]] = violations.get(rec["employee_email"], 0) + missed
+        d += timedelta(days=1)
+    start = datetime.combine(this_month_start, time.min)
+    for email, _ in sorted(violations.items(), key=lambda x: x[1], reverse=True)[:6]:
+        await ppe_col.find({"company_id": BENCH_COMPANY, "employee_email": email,
+                            "timestamp": {"$gte": start}}).to_list(length=None)
+
+
+async def measure(name: str, fn, runs: int):
+    await fn()  # warm caches and connections
+    timings = []
+    for _ in range(runs):
+        counter.reset()
+        started = clock.perf_counter()
+        await fn()
+        timings.append(clock.perf_counter() - started)
+    print(f"{name:<22} {counter.commands:>5} round trips {counter.reply_bytes / 1024:>10.1f} KiB "
+          f"median {statistics.median(timings) * 1000:>8.1f} ms  p95 {sorted(timings)[int(len(timings) * 0.95) - 1] * 1000:>8.1f} ms")
+
+
+async def bench(runs: int):
+    await measure("weekly (per-day)", legacy_weekly, runs)
+    await measure("weekly (rollup)", lambda: build_weekly_dashboard(BENCH_COMPANY), runs)
+    await measure("monthly (per-day)", legacy_monthly, runs)
+    await measure("monthly (rollup)", lambda: build_monthly_dashboard(BENCH_COMPANY), runs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seed", action="store_true", help="(re)create the bench company dataset first")
+    parser.add_argument("--employees", type=int, default=500)
+    parser.add_argument("--days", type=int, default=62)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--cleanup", action="store_true", help="delete the bench dataset and exit")
+    args = parser.parse_args()
+
+    async def run():
+        if args.cleanup:
+            await cleanup()
+            return
+        if args.seed:
+            await seed(args.employees, args.days)
+        await bench(args.runs)
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Compare bytes on the wire and server-side decode time for the three
+/detect/ppe_detect frame encodings: JSON with a base64 data URL, multipart
+upload, and a raw JPEG body.
+
+    python -m backend.scripts.bench_frame_upload [frame.jpg] [--repeat 200]
+"""
+import argparse
+import base64
+import io
+import json
+import time
+from PIL import Image
+from backend.utils.frames import decode_bytes, decode_data_url
+
+BOUNDARY = "----wolfeyeframe"
+
+
+def sample_jpeg() -> bytes:
+    image = Image.effect_noise((1280, 720), 64).convert("RGB")
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=80)
+    return buffer.getvalue()
+
+
+def json_body(jpeg: bytes) -> bytes:
+    data_url = "data:image/jpeg;base64," + base64.b64encode(jpeg).decode()
+    return json.dumps({"image": data_url, "session_id": "bench"}).encode()
+
+
+def multipart_body(jpeg: bytes) -> bytes:
+    return (
+        f"--{BOUNDARY}\r\nContent-Disposition: form-data; name=\"session_id\"\r\n\r\nbench\r\n"
+        f"--{BOUNDARY}\r\nContent-Disposition: form-data; name=\"image\"; filename=\"frame.jpg\"\r\n"
+        f"Content-Type: image/jpeg\r\n\r\n"
+    ).encode() + jpeg + f"\r\n--{BOUNDARY}--\r\n".encode()
+
+
+def decode_json(body: bytes):
+    payload = json.loads(body)
+    decode_data_url(payload["image"]).load()
+
+
+def decode_raw(body: bytes):
+    decode_bytes(body).load()
+
+
+def timed(fn, body: bytes, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(body)
+    return (time.perf_counter() - start) * 1000 / repeat
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("image", nargs="?")
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    if args.image:
+        with open(args.image, "rb") as f:
+            jpeg = f.read()
+    else:
+        jpeg = sample_jpeg()
+
+    # multipart parsing is done by starlette before the handler runs, so only
+    # its wire size is compared; its decode path is the same as the raw body
+    rows = [
+        ("json (base64)", len(json_body(jpeg)), timed(decode_json, json_body(jpeg), args.repeat)),
+        ("multipart", len(multipart_body(jpeg)), None),
+        ("raw jpeg", len(jpeg), timed(decode_raw, jpeg, args.repeat)),
+    ]
+    print(f"{'encoding':<16}{'bytes':>10}{'vs raw':>9}{'decode ms':>12}")
+    for name, size, ms in rows:
+        decode = f"{ms:.2f}" if ms is not None else "-"
+        print(f"{name:<16}{size:>10}{size / len(jpeg):>8.2f}x{decode:>12}")
@@ -0,0 +1,98 @@
+"""
+Compare PPE model backends on a folder of local images: single-frame latency,
+batched throughput, and detection agreement with the PyTorch .pt model.
+
+    python -m backend.scripts.bench_ppe_model images/ --backends pytorch onnx openvino --int8
+"""
+import argparse
+import os
+import statistics
+import time
+from PIL import Image
+from backend.config import PPEModelConfig
+from backend.utils.ppe_model import load_ppe_model, model_path
+from backend.utils.preprocess import iou
+
+IMAGE_EXTS = (".jpg", ".jpeg", ".png", ".bmp", ".webp")
+
+
+def load_images(folder: str) -> list:
+    paths = sorted(p for p in os.listdir(folder) if p.lower().endswith(IMAGE_EXTS))
+    return [Image.open(os.path.join(folder, p)).convert("RGB") for p in paths]
+
+
+def predict(model, images: list) -> list:
+    results = model(images, conf=PPEModelConfig.CONF, imgsz=PPEModelConfig.MAX_SIDE, verbose=False)
+    return [[(model.names[int(b.cls)], b.xyxy[0].tolist()) for b in r.boxes] for r in results]
+
+
+def agreement(reference: list, candidate: list, min_iou: float = 0.5):
+    """Per-image class-set match rate and box-level F1 against the reference detections."""
+    same_classes = 0
+    matched = ref_total = cand_total = 0
+    for ref, cand in zip(reference, candidate):
+        same_classes += {c for c, _ in ref} == {c for c, _ in cand}
+        ref_total += len(ref)
+        cand_total += len(cand)
+        unused = list(cand)
+        for cls, box in ref:
+            hit = next((d for d in unused if d[0] == cls and iou(d[1], box) >= min_iou), None)
+            if hit is not None:
+                unused.remove(hit)
+                matched += 1
+    precision = matched / cand_total if cand_total else 1.0
+    recall = matched / ref_total if ref_total else 1.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    return same_classes / len(reference), f1
+
+
+def bench(model, images: list, batch: int, warmup: int = 3):
+    for image in images[:warmup]:
+        predict(model, [image])
+
+    latencies = []
+    detections = []
+    for image in images:
+        start = time.perf_counter()
+        detections.extend(predict(model, [image]))
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    for i in range(0, len(images), batch):
+        predict(model, images[i:i + batch])
+    throughput = len(images) / (time.perf_counter() - start)
+
+    latencies.sort()
+    p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+    return statistics.median(latencies), p95, throughput, detections
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("images")
+    parser.add_argument("--backends", nargs="+", default=["pytorch", "onnx", "openvino"])
+    parser.add_argument("--int8", action="store_true", help="also benchmark the INT8 exports")
+    parser.add_argument("--batch", type=int, default=PPEModelConfig.MAX_BATCH)
+    args = parser.parse_args()
+
+    images = load_images(args.images)
+    if not images:
+        raise SystemExit(f"No images found in {args.images}")
+
+    variants = [(b, False) for b in args.backends]
+    if args.int8:
+        variants += [(b, True) for b in args.backends if b != "pytorch"]
+
+    print(f"{len(images)} images, batch {args.batch}")
+    print(f"{'backend':<16}{'p50 ms':>9}{'p95 ms':>9}{'img/s':>9}{'class match':>13}{'box F1':>9}")
+    reference = None
+    for backend, int8 in variants:
+        if backend != "pytorch" and not os.path.exists(model_path(backend, int8)):
+            print(f"{backend + (' int8' if int8 else ''):<16}  skipped, export it first")
+            continue
+        p50, p95, throughput, detections = bench(load_ppe_model(backend, int8), images, args.batch)
+        if reference is None:
+            reference = detections if backend == "pytorch" else None
+        match, f1 = agreement(reference, detections) if reference else (float("nan"), float("nan"))
+        name = backend + (" int8" if int8 else "")
+        print(f"{name:<16}{p50:>9.1f}{p95:>9.1f}{throughput:>9.1f}{match:>13.2%}{f1:>9.3f}")
@@ -0,0 +1,81 @@
+"""
+Guard start-up time: import backend.main in fresh interpreters, check that no
+heavy ML library came along, and optionally time the model warm-up until
+/health/ready turns green.
+
+    python -m backend.scripts.bench_startup --runs 5 --budget 1.0
+    python -m backend.scripts.bench_startup --warmup
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+HEAVY_MODULES = ("deepface", "ultralytics", "torch", "tensorflow", "cv2", "onnxruntime", "openvino")
+
+IMPORT_PROBE = f"""
+import json, sys, time
+started = time.perf_counter()
+import backend.main
+elapsed = time.perf_counter() - started
+print(json.dumps({{"seconds": elapsed, "heavy": [m for m in {HEAVY_MODULES!r} if m in sys.modules]}}))
+"""
+
+WARMUP_PROBE = """
+import json, time
+started = time.perf_counter()
+from fastapi.testclient import TestClient
+from backend.main import app
+with TestClient(app) as client:
+    first_response = None
+    while True:
+        if first_response is None and client.get("/health/live").status_code == 200:
+            first_response = time.perf_counter() - started
+        report = client.get("/health/ready").json()
+        if report["status"] not in ("pending", "warming"):
+            break
+        time.sleep(0.2)
+print(json.dumps({"first_response": first_response, "ready": time.perf_counter() - started, "report": report}))
+"""
+
+
+def probe(code: str) -> dict:
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget", type=float, default=1.0, help="max median import time in seconds")
+    parser.add_argument("--warmup", action="store_true", help="also time model warm-up until ready")
+    args = parser.parse_args()
+
+    results = [probe(IMPORT_PROBE) for _ in range(args.runs)]
+    seconds = [r["seconds"] for r in results]
+    heavy = sorted({m for r in results for m in r["heavy"]})
+    median = statistics.median(seconds)
+    print(f"import backend.main: median {median:.3f}s, min {min(seconds):.3f}s, max {max(seconds):.3f}s")
+
+    failed = False
+    if heavy:
+        print(f"FAIL: heavy modules imported at start-up: {', '.join(heavy)}")
+        failed = True
+    if median > args.budget:
+        print(f"FAIL: median import time {median:.3f}s exceeds budget {args.budget:.3f}s")
+        failed = True
+
+    if args.warmup:
+        result = probe(WARMUP_PROBE)
+        print(f"first response after {result['first_response']:.3f}s, "
+              f"models {result['report']['status']} after {result['ready']:.1f}s")
+        if result["report"]["status"] != "ready":
+            print(f"FAIL: warm-up {result['report']['status']}: {result['report']['error']}")
+            failed = True
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
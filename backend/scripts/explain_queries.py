@@ -0,0 +1,125 @@
+"""
+Run explain() on the queries the routes issue and flag any that fall back to a
+collection scan. Exits non-zero when one does, so it can gate a deploy.
+
+    python -m backend.scripts.explain_queries
+    python -m backend.scripts.explain_queries --company-id <id> --email <employee email>
+    python -m backend.scripts.explain_queries --ensure   # create the indexes first
+"""
+import argparse
+import asyncio
+import sys
+from datetime import date, datetime, time, timedelta
+from backend.db import db
+from backend.indexes import ensure_indexes
+from backend.crud.dashboard import PPE_RECORD_FIELDS
+
+
+def route_queries(company_id: str, email: str) -> list:
+    """(name, collection, kind, query) for every hot read; kind is "find" or "aggregate"."""
+    today = date.today()
+    day_start = datetime.combine(today, time.min)
+    month_start = today.replace(day=1)
+    days = {"$gte": (today - timedelta(days=13)).isoformat(), "$lte": today.isoformat()}
+    return [
+        ("login: admin by email", "admin", "find", {"filter": {"email": email}}),
+        ("login: company by email", "company", "find", {"filter": {"email": email}}),
+        ("login: employee by email", "employee", "find", {"filter": {"email": email}}),
+        ("points: employee by email", "employee", "find", {"filter": {"email": email}}),
+        ("employees of company", "employee", "find", {"filter": {"company_id": company_id}}),
+        ("attendance list today", "attendance", "find",
+         {"filter": {"company_id": company_id, "attendance_date": today.isoformat()}}),
+        ("attendance upsert key", "attendance", "find",
+         {"filter": {"employee_email": email, "attendance_date": today.isoformat()}}),
+        ("attendance of employee", "attendance", "find", {"filter": {"employee_email": email}}),
+        ("employee dashboard: today's ppe", "ppe_records", "find",
+         {"filter": {"employee_email": email, "timestamp": {"$gte": day_start, "$lt": day_start + timedelta(days=1)}}}),
+        ("ppe records of company", "ppe_records", "aggregate",
+         {"pipeline": [{"$match": {"company_id": company_id, "timestamp": {"$gte": day_start - timedelta(days=13)}}},
+                       *PPE_RECORD_FIELDS]}),
+        ("attendance of company", "attendance", "aggregate",
+         {"pipeline": [{"$match": {"company_id": company_id, "attendance_date": days}},
+                       {"$group": {"_id": "$attendance_date", "rows": {"$sum": 1}}}]}),
+        ("rollup: company days", "daily_stats", "find",
+         {"filter": {"scope": "company", "company_id": company_id, "day": days}}),
+        ("rollup: employee days of company", "daily_stats", "aggregate",
+         {"pipeline": [{"$match": {"scope": "employee", "company_id": company_id, "day": days}},
+                       {"$group": {"_id": "$employee_email", "records": {"$sum": "$records"}}}]}),
+        ("rollup: employee month", "daily_stats", "find",
+         {"filter": {"scope": "employee", "employee_email": email,
+                     "day": {"$gte": month_start.isoformat(), "$lte": today.isoformat()}},
+          "sort": [("day", 1)]}),
+        ("audit windows", "ppe_audit_windows", "find",
+         {"filter": {"audit_id": "000000000000000000000000"}, "sort": [("window_start", 1)]}),
+    ]
+
+
+def plan_stages(node) -> list:
+    """Every "stage" name anywhere in an explain document."""
+    stages = []
+    if isinstance(node, dict):
+        if isinstance(node.get("stage"), str):
+            stages.append(node["stage"])
+        for value in node.values():
+            stages.extend(plan_stages(value))
+    elif isinstance(node, list):
+        for value in node:
+            stages.extend(plan_stages(value))
+    return stages
+
+
+async def explain(collection: str, kind: str, query: dict) -> dict:
+    if kind == "find":
+        command = {"find": collection, "filter": query["filter"]}
+        if query.get("sort"):
+            command["sort"] = dict(query["sort"])
+    else:
+        command = {"aggregate": collection, "pipeline": query["pipeline"], "cursor": {}}
+    return await db.command("explain", command, verbosity="queryPlanner")
+
+
+async def check(company_id: str, email: str) -> int:
+    scans = 0
+    for name, collection, kind, query in route_queries(company_id, email):
+        try:
+            plan = await explain(collection, kind, query)
+        except Exception as e:
+            print(f"ERROR    {name:<36} {collection}: {e}")
+            scans += 1
+            continue
+        stages = plan_stages(plan)
+        flag = "COLLSCAN" if "COLLSCAN" in stages else "ok"
+        scans += flag != "ok"
+        shown = [s for s in dict.fromkeys(stages) if s in ("COLLSCAN", "IXSCAN", "IDHACK", "EXPRESS_IXSCAN")]
+        print(f"{flag:<8} {name:<36} {collection:<18} {' > '.join(shown) or '-'}")
+    return scans
+
+
+async def sample_ids():
+    """A real company id and employee email, so the planner sees realistic values."""
+    employee = await db["employee"].find_one({"company_id": {"$exists": True}}, {"company_id": 1, "email": 1})
+    if employee:
+        return str(employee["company_id"]), employee["email"]
+    return "explain-company", "explain@example.com"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--company-id")
+    parser.add_argument("--email")
+    parser.add_argument("--ensure", action="store_true", help="run the startup index bootstrap first")
+    args = parser.parse_args()
+
+    async def run():
+        if args.ensure:
+            await ensure_indexes()
+        company_id, email = await sample_ids()
+        scans = await check(args.company_id or company_id, args.email or email)
+        print(f"{scans} quer{'y' if scans == 1 else 'ies'} not using an index" if scans else "all queries use an index")
+        return scans
+
+    sys.exit(1 if asyncio.run(run()) else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,16 @@
+"""
+Export backend/routes/best.pt for the ONNX Runtime or OpenVINO backends.
+
+    python -m backend.scripts.export_ppe_model onnx [--int8]
+    python -m backend.scripts.export_ppe_model openvino --int8 --data calib.yaml
+"""
+import argparse
+from backend.utils.ppe_model import export_ppe_model
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("backend", choices=["onnx", "openvino"])
+    parser.add_argument("--int8", action="store_true")
+    parser.add_argument("--data", help="dataset yaml used to calibrate OpenVINO INT8 quantization")
+    args = parser.parse_args()
+    export_ppe_model(args.backend, int8=args.int8, data=args.data)
@@ -0,0 +1,57 @@
+"""
+Measure recall@1 and per-query latency of the IVF face index against the exact
+scan for one company's stored embeddings.
+
+    python -m backend.scripts.face_index_recall <company_id> --nprobe 1 4 8 16 --rerank 32
+"""
+import argparse
+import asyncio
+import time
+import numpy as np
+from backend.crud.face_gallery import load_gallery
+from backend.crud.face_index import ExactIndex, IVFIndex
+
+
+def run(matrix: np.ndarray, nprobes, reranks, queries: int, noise: float):
+    rng = np.random.default_rng(0)
+    probes = matrix[rng.integers(0, len(matrix), queries)]
+    probes = probes + noise * rng.standard_normal(probes.shape).astype(np.float32) / np.sqrt(matrix.shape[1])
+    probes /= np.linalg.norm(probes, axis=1, keepdims=True)
+
+    exact = ExactIndex(matrix)
+    start = time.perf_counter()
+    truth = [exact.search(q, 1)[0][0] for q in probes]
+    exact_ms = (time.perf_counter() - start) * 1000 / queries
+    print(f"exact scan: {exact_ms:.3f} ms/query ({len(matrix)} rows)")
+
+    start = time.perf_counter()
+    index = IVFIndex(matrix)
+    print(f"ivf build: {time.perf_counter() - start:.2f} s, {index.nlist} lists")
+
+    for rerank in reranks:
+        for nprobe in nprobes:
+            start = time.perf_counter()
+            found = [index.search(q, 1, nprobe=nprobe, rerank=rerank)[0][0] for q in probes]
+            ms = (time.perf_counter() - start) * 1000 / queries
+            recall = float(np.mean(np.asarray(found) == np.asarray(truth)))
+            print(f"nprobe={nprobe:<4} rerank={rerank:<4} recall@1={recall:.3f}  {ms:.3f} ms/query")
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("company_id")
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 4, 8, 16, 32])
+    parser.add_argument("--rerank", type=int, nargs="+", default=[32])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--noise", type=float, default=0.3)
+    args = parser.parse_args()
+
+    gallery = await load_gallery(args.company_id)
+    if not len(gallery):
+        print("No embeddings stored for this company")
+        return
+    run(gallery.matrix, args.nprobe, args.rerank, args.queries, args.noise)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,46 @@
+"""
+Convert employee embeddings stored as float lists into normalized binary blobs.
+
+    python -m backend.scripts.migrate_embeddings [--dtype float16] [--dry-run]
+"""
+import argparse
+import asyncio
+from pymongo import UpdateOne
+from backend.db import db
+from backend.crud.helper import encode_embedding, EMBEDDING_SUBTYPES
+
+employee_col = db["employee"]
+BATCH_SIZE = 500
+
+
+async def migrate(dtype: str, dry_run: bool):
+    query = {"embedding": {"$type": "array"}}
+    total = await employee_col.count_documents(query)
+    print(f"{total} employee documents still store list embeddings")
+    if dry_run or not total:
+        return
+
+    migrated = 0
+    batch = []
+    async for emp in employee_col.find(query, {"embedding": 1}):
+        batch.append(UpdateOne(
+            {"_id": emp["_id"], "embedding": {"$type": "array"}},
+            {"$set": {"embedding": encode_embedding(emp["embedding"], dtype)}}
+        ))
+        if len(batch) >= BATCH_SIZE:
+            result = await employee_col.bulk_write(batch, ordered=False)
+            migrated += result.modified_count
+            batch = []
+    if batch:
+        result = await employee_col.bulk_write(batch, ordered=False)
+        migrated += result.modified_count
+
+    print(f"Migrated {migrated} embeddings to {dtype}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--dtype", choices=list(EMBEDDING_SUBTYPES), default="float32")
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+    asyncio.run(migrate(args.dtype, args.dry_run))
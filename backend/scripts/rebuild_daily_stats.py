@@ -0,0 +1,53 @@
+"""
+Backfill or rebuild the daily_stats rollup from the raw attendance and
+ppe_records collections. Only closed days are rebuilt by default; today's
+rollup is maintained by the live writers. --include-today rebuilds it as well
+and must only be used while the API is stopped.
+
+    python -m backend.scripts.rebuild_daily_stats                      # everything
+    python -m backend.scripts.rebuild_daily_stats --company-id <id> --since 2025-01-01
+    python -m backend.scripts.rebuild_daily_stats --company-id <id> --verify
+"""
+import argparse
+import asyncio
+from datetime import date, timedelta
+from backend.crud.daily_stats import rebuild_daily_stats
+from backend.crud.dashboard import attendance_summary, ppe_summary, rollup_summary
+
+
+async def verify(company_id: str, days: int) -> bool:
+    """Compare rollup-based summaries with the raw aggregation pipelines over the last `days` days."""
+    end = date.today()
+    start = end - timedelta(days=days - 1)
+    raw = await asyncio.gather(attendance_summary(company_id, start, end), ppe_summary(company_id, start, end))
+    rolled = await rollup_summary(company_id, start, end)
+
+    ok = True
+    for name, expected, actual in zip(("attendance", "ppe"), raw, rolled):
+        for field in expected:
+            if expected[field] != actual[field]:
+                print(f"MISMATCH {name}.{field}:\n  raw    {expected[field]}\n  rollup {actual[field]}")
+                ok = False
+    print("Rollup matches raw collections" if ok else "Rollup differs from raw collections")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--company-id", help="only rebuild this company")
+    parser.add_argument("--since", type=date.fromisoformat, help="only rebuild days from this date (YYYY-MM-DD)")
+    parser.add_argument("--include-today", action="store_true",
+                        help="also rebuild today (stop the API first: live writes would be lost)")
+    parser.add_argument("--verify", action="store_true", help="compare against the raw collections instead of rebuilding")
+    parser.add_argument("--days", type=int, default=62, help="window checked by --verify")
+    args = parser.parse_args()
+
+    if args.verify:
+        if not args.company_id:
+            parser.error("--verify needs --company-id")
+        raise SystemExit(0 if asyncio.run(verify(args.company_id, args.days)) else 1)
+    asyncio.run(rebuild_daily_stats(args.company_id, args.since, args.include_today))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+BatchedWriter behaviour against a fake collection: upsert follow-ups, failing
+callbacks and shutdown.
+
+    python -m pytest backend/tests
+"""
+import asyncio
+
+from pymongo import InsertOne, UpdateOne
+
+from backend.utils.write_queue import BatchedWriter
+
+
+class BulkResult:
+    def __init__(self, upserted_ids):
+        self.upserted_ids = upserted_ids
+
+
+class FakeCollection:
+    """Keeps docs by _id; an UpdateOne upsert inserts only when its _id is new."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.docs = {}
+        self.calls = 0
+
+    async def bulk_write(self, ops, ordered=True):
+        self.calls += 1
+        upserted = {}
+        for i, op in enumerate(ops):
+            if isinstance(op, InsertOne):
+                self.docs[op._doc["_id"]] = dict(op._doc)
+                continue
+            _id = op._filter["_id"]
+            if _id not in self.docs:
+                if not op._upsert:
+                    continue
+                self.docs[_id] = {"_id": _id}
+                upserted[i] = _id
+            for field, value in op._doc.get("$inc", {}).items():
+                self.docs[_id][field] = self.docs[_id].get(field, 0) + value
+        return BulkResult(upserted)
+
+
+def run(coro, timeout: float = 5):
+    async def bounded():
+        return await asyncio.wait_for(coro, timeout)
+    return asyncio.run(bounded())
+
+
+def upsert(_id):
+    return UpdateOne({"_id": _id}, {"$inc": {"n": 1}}, upsert=True)
+
+
+def test_follow_ups_only_fire_when_the_upsert_inserted():
+    attendance, stats = FakeCollection("attendance"), FakeCollection("daily_stats")
+
+    async def scenario():
+        writer = BatchedWriter(max_batch=10, max_wait_ms=5, max_queue=100)
+        for _ in range(3):
+            await writer.write(attendance, upsert("e1|today"), if_upserted=[
+                (stats, UpdateOne({"_id": "present"}, {"$inc": {"n": 1}}, upsert=True)),
+            ])
+            await writer.flush()
+        await writer.close()
+        return writer.stats()
+
+    stats_report = run(scenario())
+    assert attendance.docs["e1|today"]["n"] == 3
+    assert stats.docs["present"]["n"] == 1
+    assert stats_report["failed"] == 0
+
+
+def test_nested_follow_ups_run_in_the_same_flush():
+    records, attendance, stats = FakeCollection("ppe"), FakeCollection("attendance"), FakeCollection("stats")
+
+    async def scenario():
+        writer = BatchedWriter(max_batch=10, max_wait_ms=5, max_queue=100)
+        await writer.write(attendance, upsert("e1|today"))
+        await writer.flush()
+        for record in ("r1", "r2"):
+            await writer.write(records, upsert(record), if_upserted=[
+                (attendance, upsert("e1|today"), [(stats, upsert("present"))]),
+                (attendance, upsert("e2|today"), [(stats, upsert("present"))]),
+            ])
+        await writer.close()
+
+    run(scenario())
+    # e1 already existed and e2 is only inserted once, so "present" counts one insert
+    assert attendance.docs["e1|today"]["n"] == 3
+    assert attendance.docs["e2|today"]["n"] == 2
+    assert stats.docs["present"]["n"] == 1
+
+
+def test_failing_callback_does_not_stop_the_drain():
+    collection = FakeCollection("c")
+    called = []
+
+    def boom():
+        raise RuntimeError("callback failed")
+
+    async def later():
+        called.append("async")
+
+    async def scenario():
+        writer = BatchedWriter(max_batch=1, max_wait_ms=1, max_queue=10)
+        await writer.write(collection, upsert("a"), on_written=boom)
+        await writer.write(collection, upsert("b"), on_written=later)
+        await writer.write(collection, upsert("c"), on_written=lambda: called.append("sync"))
+        await writer.close()
+        return writer.stats()
+
+    report = run(scenario())
+    assert set(collection.docs) == {"a", "b", "c"}
+    assert called == ["async", "sync"]
+    assert report["written"] == 3
+
+
+def test_flush_and_close_return_after_a_bulk_write_error():
+    class Failing(FakeCollection):
+        async def bulk_write(self, ops, ordered=True):
+            raise RuntimeError("mongo down")
+
+    failing = Failing("failing")
+    called = []
+
+    async def scenario():
+        writer = BatchedWriter(max_batch=5, max_wait_ms=1, max_queue=2)
+        # more ops than the queue holds, so write() has to wait for the drain
+        for i in range(6):
+            await writer.write(failing, upsert(i), on_written=lambda: called.append(1))
+        await writer.flush()
+        await writer.close()
+        await writer.close()
+        return writer.stats()
+
+    report = run(scenario())
+    assert report["failed"] == 6
+    assert report["queue_depth"] == 0
+    assert len(called) == 6
+
+
+def test_flush_and_close_without_writes():
+    async def scenario():
+        writer = BatchedWriter(max_batch=5, max_wait_ms=1, max_queue=5)
+        await writer.flush()
+        await writer.close()
+
+    run(scenario())
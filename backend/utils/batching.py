@@ -0,0 +1,75 @@
+import asyncio
+import time
+from collections import Counter
+from backend.utils.inference import run_inference
+
+
+class MicroBatcher:
+    """
+    Collects items submitted by concurrent requests for up to `max_wait_ms` or
+    until `max_batch` items are queued, runs `batch_fn` once on the inference
+    executor and hands each caller its own result.
+    """
+
+    def __init__(self, batch_fn, max_batch: int, max_wait_ms: float):
+        self.batch_fn = batch_fn
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max_wait_ms / 1000
+        self._pending = []
+        self._timer = None
+        self._tasks = set()
+        self._batch_sizes = Counter()
+        self._frames = 0
+        self._wait_total = 0.0
+
+    async def submit(self, item):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future, time.perf_counter()))
+
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        while self._pending:
+            batch, self._pending = self._pending[:self.max_batch], self._pending[self.max_batch:]
+            task = asyncio.create_task(self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch):
+        now = time.perf_counter()
+        self._batch_sizes[len(batch)] += 1
+        self._frames += len(batch)
+        self._wait_total += sum(now - queued for _, _, queued in batch)
+
+        try:
+            results = await run_inference(self.batch_fn, [item for item, _, _ in batch])
+        except Exception as e:
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future, _), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    def stats(self) -> dict:
+        batches = sum(self._batch_sizes.values())
+        return {
+            "max_batch": self.max_batch,
+            "max_wait_ms": self.max_wait * 1000,
+            "batches": batches,
+            "frames": self._frames,
+            "avg_batch_size": self._frames / batches if batches else 0,
+            "avg_batch_fill": self._frames / (batches * self.max_batch) if batches else 0,
+            "avg_batch_wait_ms": self._wait_total * 1000 / self._frames if self._frames else 0,
+            "batch_size_histogram": dict(sorted(self._batch_sizes.items())),
+        }
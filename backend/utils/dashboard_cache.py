@@ -0,0 +1,138 @@
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from datetime import date
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from backend.config import DashboardCacheConfig
+from backend.utils.versions import create_versions
+
+
+def make_etag(payload) -> str:
+    body = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str).encode()
+    return '"' + hashlib.sha1(body).hexdigest() + '"'
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    # weak validators (W/"...") compare equal for GET revalidation
+    return "*" in tags or any(tag.removeprefix("W/") == etag for tag in tags)
+
+
+class DashboardCache:
+    """
+    Computed dashboard payloads per (company, dashboard, day) with their ETag and
+    the invalidation version they were built at. Entries live for `ttl` seconds,
+    the least recently used are evicted past `max_entries`, and an entry is only
+    served while its company's version and the global generation are unchanged;
+    every write to a company's PPE records or attendance bumps the former,
+    clear() the latter. With Redis versions this holds across workers.
+    """
+
+    def __init__(self, ttl: float = DashboardCacheConfig.TTL, max_entries: int = DashboardCacheConfig.MAX_ENTRIES,
+                 enabled: bool = DashboardCacheConfig.ENABLED, versions=None):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.enabled = enabled
+        self.versions = versions or create_versions(DashboardCacheConfig.VERSIONS, "dashboard")
+        self._entries = OrderedDict()  # (company_id, name, day) -> (stored_at, version, etag, payload)
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.invalidations = 0
+        self.evicted = 0
+        self.version_errors = 0
+
+    def get(self, key: tuple, version: tuple):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if time.time() - entry[0] > self.ttl or entry[1] != version:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def put(self, key: tuple, version: tuple, etag: str, payload):
+        self._entries[key] = (time.time(), version, etag, payload)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evicted += 1
+
+    async def invalidate(self, company_id: str):
+        self.invalidations += 1
+        for key in [k for k in self._entries if k[0] == company_id]:
+            del self._entries[key]
+        try:
+            await self.versions.bump(company_id)
+        except Exception as e:
+            self.version_errors += 1
+            print(f"[DashboardCache] Could not bump version for {company_id}: {e}")
+
+    async def clear(self):
+        self._entries.clear()
+        try:
+            await self.versions.bump_all()
+        except Exception as e:
+            self.version_errors += 1
+            print(f"[DashboardCache] Could not bump generation: {e}")
+
+    async def _version(self, company_id: str):
+        try:
+            return await self.versions.current(company_id)
+        except Exception as e:
+            # without a version nothing can be validated, so don't cache at all
+            self.version_errors += 1
+            print(f"[DashboardCache] Could not read version for {company_id}: {e}")
+            return None
+
+    async def serve(self, request: Request, response: Response, company_id: str, name: str, build):
+        """
+        Return the cached payload for this dashboard, building it with `build(company_id)`
+        on a miss. A matching If-None-Match gets an empty 304 instead.
+        """
+        key = (company_id, name, date.today().isoformat())
+        version = await self._version(company_id) if self.enabled else None
+        entry = self.get(key, version) if version is not None else None
+        if entry is not None:
+            self.hits += 1
+            _, _, etag, payload = entry
+        else:
+            self.misses += 1
+            payload = jsonable_encoder(await build(company_id))
+            etag = make_etag(payload)
+            # a write that landed while building may not be reflected, so don't keep it
+            if version is not None and await self._version(company_id) == version:
+                self.put(key, version, etag, payload)
+
+        headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            self.not_modified += 1
+            return Response(status_code=304, headers=headers)
+        response.headers.update(headers)
+        return payload
+
+    async def close(self):
+        await self.versions.close()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "not_modified": self.not_modified,
+            "invalidations": self.invalidations,
+            "evicted": self.evicted,
+            "versions": self.versions.name,
+            "version_errors": self.version_errors,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+dashboard_cache = DashboardCache()
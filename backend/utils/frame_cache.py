@@ -0,0 +1,114 @@
+import asyncio
+import io
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+import numpy as np
+from PIL import Image
+from backend.config import FrameCacheConfig
+
+HASH_SIZE = 8
+
+
+def dhash(image: Image.Image, size: int = HASH_SIZE) -> int:
+    """64-bit difference hash of a frame."""
+    fp = getattr(image, "fp", None)
+    if fp is not None:
+        # the frame is still lazily opened: decode a tiny independent copy so the
+        # original keeps its full resolution for inference
+        position = fp.tell()
+        fp.seek(0)
+        thumb = Image.open(io.BytesIO(fp.read()))
+        fp.seek(position)
+        thumb.draft("L", (size * 8, size * 8))
+        image = thumb
+    small = np.asarray(image.convert("L").resize((size + 1, size), Image.BILINEAR), dtype=np.int16)
+    bits = (small[:, 1:] > small[:, :-1]).ravel()
+    return int("".join("1" if b else "0" for b in bits), 2)
+
+
+def dhash_file(path: str, size: int = HASH_SIZE) -> int:
+    with Image.open(path) as image:
+        return dhash(image, size)
+
+
+async def hash_frame(frame) -> int:
+    """dhash of a PIL image or image path, computed off the event loop (decoding is CPU bound)."""
+    return await asyncio.to_thread(dhash_file if isinstance(frame, str) else dhash, frame)
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+class FrameCache:
+    """
+    Last result per camera/session key, reused while new frames stay within
+    `max_distance` bits of the cached frame's hash and the entry is younger
+    than `ttl` seconds. The least recently used keys are evicted past `max_entries`.
+    """
+
+    def __init__(self, name: str, max_distance: int = FrameCacheConfig.MAX_DISTANCE,
+                 ttl: float = FrameCacheConfig.TTL, max_entries: int = FrameCacheConfig.MAX_ENTRIES,
+                 enabled: bool = FrameCacheConfig.ENABLED):
+        self.name = name
+        self.max_distance = max_distance
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.enabled = enabled
+        self._entries = OrderedDict()  # key -> (stored_at, hash, result)
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evicted = 0
+
+    def get(self, key: str, frame_hash: int) -> Optional[Any]:
+        if not self.enabled:
+            return None
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        stored_at, cached_hash, result = entry
+        if time.time() - stored_at > self.ttl:
+            del self._entries[key]
+            self.expired += 1
+            self.misses += 1
+            return None
+        if hamming(frame_hash, cached_hash) > self.max_distance:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return result
+
+    def put(self, key: str, frame_hash: int, result: Any):
+        if not self.enabled:
+            return
+        self._entries[key] = (time.time(), frame_hash, result)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evicted += 1
+
+    def invalidate(self, key: str):
+        self._entries.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "expired": self.expired,
+            "evicted": self.evicted,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+face_frame_cache = FrameCache("face")
+ppe_frame_cache = FrameCache("ppe")
@@ -0,0 +1,94 @@
+import base64
+import io
+import json
+from PIL import Image, UnidentifiedImageError
+from fastapi import Request
+
+RAW_IMAGE_TYPES = ("image/jpeg", "image/png", "image/webp", "application/octet-stream")
+
+
+class FrameError(ValueError):
+    pass
+
+
+def decode_data_url(data_url: str) -> Image.Image:
+    """Decode a base64 data URL (or bare base64 string) as sent by the webcam component."""
+    try:
+        img_data = base64.b64decode(data_url[data_url.find(",") + 1:], validate=False)
+    except Exception:
+        raise FrameError("Invalid image format.")
+    return decode_bytes(img_data)
+
+
+def decode_bytes(data) -> Image.Image:
+    # BytesIO shares the buffer of an immutable bytes object, so no copy is made here;
+    # PIL only parses the header now, pixels are decoded later inside the inference worker
+    try:
+        return Image.open(io.BytesIO(data))
+    except (UnidentifiedImageError, OSError):
+        raise FrameError("Invalid image format.")
+
+
+def decode_file(file) -> Image.Image:
+    try:
+        return Image.open(file)
+    except (UnidentifiedImageError, OSError):
+        raise FrameError("Invalid image format.")
+
+
+def sample_indices(total: int, count: int) -> list:
+    """Evenly spread `count` indices over `total` items."""
+    if total <= count:
+        return list(range(total))
+    step = total / count
+    return [int(i * step + step / 2) for i in range(count)]
+
+
+def sample_video_frames(path: str, count: int) -> list:
+    """Decode `count` evenly spaced frames of a video file as RGB PIL images."""
+    import cv2
+
+    capture = cv2.VideoCapture(path)
+    try:
+        total = int(capture.get(cv2.CAP_PROP_FRAME_COUNT))
+        frames = []
+        for index in sample_indices(total, count):
+            capture.set(cv2.CAP_PROP_POS_FRAMES, index)
+            ok, frame = capture.read()
+            if ok:
+                frames.append(Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)))
+        return frames
+    finally:
+        capture.release()
+
+
+async def read_frame_request(request: Request, image_field: str = "image"):
+    """
+    Read one frame plus its form/JSON fields from any of the supported encodings:
+    JSON with a base64 data URL, multipart upload, or a raw image body with the
+    remaining fields in the query string or headers.
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+
+    if content_type == "multipart/form-data":
+        form = await request.form()
+        upload = form.get(image_field)
+        if upload is None or isinstance(upload, str):
+            raise FrameError("Missing image upload.")
+        fields = {k: v for k, v in form.items() if isinstance(v, str)}
+        return decode_file(upload.file), fields
+
+    if content_type in RAW_IMAGE_TYPES:
+        fields = dict(request.query_params)
+        if "x-session-id" in request.headers:
+            fields.setdefault("session_id", request.headers["x-session-id"])
+        return decode_bytes(await request.body()), fields
+
+    try:
+        payload = json.loads(await request.body())
+    except ValueError:
+        raise FrameError("Invalid request body.")
+    if not isinstance(payload, dict) or not isinstance(payload.get(image_field), str):
+        raise FrameError("Invalid image format.")
+    data_url = payload.pop(image_field)
+    return decode_data_url(data_url), payload
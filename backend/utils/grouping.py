@@ -0,0 +1,46 @@
+from typing import List
+
+
+def containment(inner: list, outer: list) -> float:
+    """Fraction of `inner`'s area that lies inside `outer`."""
+    ix = max(0.0, min(inner[2], outer[2]) - max(inner[0], outer[0]))
+    iy = max(0.0, min(inner[3], outer[3]) - max(inner[1], outer[1]))
+    area = (inner[2] - inner[0]) * (inner[3] - inner[1])
+    return ix * iy / area if area > 0 else 0.0
+
+
+def face_box(facial_area: dict) -> list:
+    x, y, w, h = facial_area["x"], facial_area["y"], facial_area["w"], facial_area["h"]
+    return [x, y, x + w, y + h]
+
+
+def group_by_person(detections: list, faces: list, min_overlap: float = 0.5) -> List[dict]:
+    """
+    Split one frame into per-person groups. Every PPE box and every face is attached
+    to the `person` box that contains the largest share of it (at least `min_overlap`);
+    each person keeps at most one face, the one best contained in their box.
+    """
+    people = [
+        {"person": det, "items": [], "face": None, "face_overlap": 0.0}
+        for det in detections if det["class"] == "person"
+    ]
+    if not people:
+        return []
+
+    for det in detections:
+        if det["class"] == "person":
+            continue
+        overlaps = [containment(det["bbox"], p["person"]["bbox"]) for p in people]
+        best = max(range(len(people)), key=overlaps.__getitem__)
+        if overlaps[best] >= min_overlap:
+            people[best]["items"].append(det)
+
+    for face in faces:
+        box = face_box(face["facial_area"])
+        overlaps = [containment(box, p["person"]["bbox"]) for p in people]
+        best = max(range(len(people)), key=overlaps.__getitem__)
+        if overlaps[best] >= min_overlap and overlaps[best] > people[best]["face_overlap"]:
+            people[best]["face"] = face
+            people[best]["face_overlap"] = overlaps[best]
+
+    return people
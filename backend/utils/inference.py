@@ -0,0 +1,107 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from fastapi import HTTPException, status
+from backend.config import InferenceConfig
+
+
+def _timed_call(fn, args, kwargs):
+    started = time.time()
+    result = fn(*args, **kwargs)
+    return started, time.time() - started, result
+
+
+class InferenceExecutor:
+    """
+    Runs blocking model calls (DeepFace, YOLO) on a dedicated thread or process
+    pool so the event loop keeps serving logins and dashboards. At most
+    `max_queue` calls may be waiting or running; beyond that callers get a 503.
+    """
+
+    def __init__(self, mode: str = InferenceConfig.MODE, workers: int = InferenceConfig.WORKERS,
+                 max_queue: int = InferenceConfig.MAX_QUEUE, timeout: float = InferenceConfig.TIMEOUT):
+        self.mode = mode
+        self.workers = workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._pool = None
+        self._pending = 0
+        self.metrics = {
+            "submitted": 0,
+            "completed": 0,
+            "failed": 0,
+            "rejected": 0,
+            "timed_out": 0,
+            "queue_wait_total": 0.0,
+            "queue_wait_max": 0.0,
+            "run_time_total": 0.0,
+            "run_time_max": 0.0,
+        }
+
+    @property
+    def pool(self):
+        if self._pool is None:
+            if self.mode == "process":
+                self._pool = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="inference")
+        return self._pool
+
+    def _release(self, _future):
+        self._pending -= 1
+
+    async def run(self, fn, *args, timeout: float = None, **kwargs):
+        if self._pending >= self.max_queue:
+            self.metrics["rejected"] += 1
+            raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                                detail="Inference queue is full, please retry shortly")
+
+        loop = asyncio.get_running_loop()
+        self._pending += 1
+        self.metrics["submitted"] += 1
+        submitted = time.time()
+        future = self.pool.submit(_timed_call, fn, args, kwargs)
+        # the slot is freed when the job really ends, not when the caller gives up on it
+        future.add_done_callback(lambda f: loop.call_soon_threadsafe(self._release, f))
+
+        try:
+            started, run_time, result = await asyncio.wait_for(asyncio.wrap_future(future),
+                                                               timeout or self.timeout)
+        except asyncio.TimeoutError:
+            self.metrics["timed_out"] += 1
+            raise HTTPException(status_code=status.HTTP_504_GATEWAY_TIMEOUT, detail="Inference timed out")
+        except Exception:
+            self.metrics["failed"] += 1
+            raise
+
+        queue_wait = max(0.0, started - submitted)
+        self.metrics["completed"] += 1
+        self.metrics["queue_wait_total"] += queue_wait
+        self.metrics["queue_wait_max"] = max(self.metrics["queue_wait_max"], queue_wait)
+        self.metrics["run_time_total"] += run_time
+        self.metrics["run_time_max"] = max(self.metrics["run_time_max"], run_time)
+        return result
+
+    def stats(self) -> dict:
+        completed = self.metrics["completed"] or 1
+        return {
+            "mode": self.mode,
+            "workers": self.workers,
+            "pending": self._pending,
+            "max_queue": self.max_queue,
+            **self.metrics,
+            "queue_wait_avg": self.metrics["queue_wait_total"] / completed,
+            "run_time_avg": self.metrics["run_time_total"] / completed,
+        }
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+inference_executor = InferenceExecutor()
+
+
+async def run_inference(fn, *args, timeout: float = None, **kwargs):
+    return await inference_executor.run(fn, *args, timeout=timeout, **kwargs)
@@ -0,0 +1,58 @@
+import os
+import shutil
+from backend.config import PPEModelConfig
+
+BACKENDS = ("pytorch", "onnx", "openvino")
+
+
+def model_path(backend: str = PPEModelConfig.BACKEND, int8: bool = PPEModelConfig.INT8,
+               weights: str = PPEModelConfig.PATH) -> str:
+    """Where the weights for a backend live; exports sit next to the .pt file."""
+    stem = os.path.splitext(weights)[0]
+    if backend == "pytorch":
+        return weights
+    if backend == "onnx":
+        return f"{stem}_int8.onnx" if int8 else f"{stem}.onnx"
+    if backend == "openvino":
+        return f"{stem}_int8_openvino_model" if int8 else f"{stem}_openvino_model"
+    raise ValueError(f"Unknown PPE model backend: {backend}")
+
+
+def load_ppe_model(backend: str = PPEModelConfig.BACKEND, int8: bool = PPEModelConfig.INT8):
+    from ultralytics import YOLO
+
+    path = model_path(backend, int8)
+    if backend != "pytorch" and not os.path.exists(path):
+        print(f"[Model] {path} not found, run backend.scripts.export_ppe_model; falling back to {PPEModelConfig.PATH}")
+        path = PPEModelConfig.PATH
+    print(f"[Model] Loading PPE model from {path}")
+    return YOLO(path, task="detect")
+
+
+def export_ppe_model(backend: str, int8: bool = False, data: str = None,
+                     imgsz: int = PPEModelConfig.MAX_SIDE) -> str:
+    """Export the .pt weights for `backend` and return the path `load_ppe_model` will use."""
+    from ultralytics import YOLO
+
+    model = YOLO(PPEModelConfig.PATH)
+    target = model_path(backend, int8)
+
+    if backend == "openvino":
+        # NNCF post-training quantization needs a calibration dataset yaml when int8 is on
+        exported = model.export(format="openvino", imgsz=imgsz, dynamic=True, int8=int8, data=data)
+    elif backend == "onnx":
+        exported = model.export(format="onnx", imgsz=imgsz, dynamic=True)
+        if int8:
+            from onnxruntime.quantization import quantize_dynamic, QuantType
+
+            quantize_dynamic(exported, target, weight_type=QuantType.QUInt8)
+            exported = target
+    else:
+        raise ValueError(f"Nothing to export for backend: {backend}")
+
+    if os.path.abspath(exported) != os.path.abspath(target):
+        if os.path.isdir(target):
+            shutil.rmtree(target)
+        os.replace(exported, target)
+    print(f"[Model] Exported {backend}{' int8' if int8 else ''} model to {target}")
+    return target
@@ -0,0 +1,76 @@
+from typing import Optional, Tuple
+from PIL import Image
+from backend.config import PPEModelConfig
+
+
+def prepare_frame(image: Image.Image, roi: Optional[list] = None, max_side: int = PPEModelConfig.MAX_SIDE):
+    """
+    Crop the frame to `roi` (full-frame x1, y1, x2, y2) when given and downscale so the
+    longest side is at most `max_side`. Returns the prepared image plus the offset and
+    scale needed to map boxes back to full-frame coordinates.
+    """
+    width, height = image.size
+    if roi is None and image.format == "JPEG":
+        # let libjpeg decode at a reduced DCT scale instead of decoding full size and resizing
+        image.draft("RGB", (max_side, max_side))
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+    scale = image.size[0] / width
+    offset = (0.0, 0.0)
+
+    if roi is not None:
+        x1, y1, x2, y2 = [int(round(v * scale)) for v in roi]
+        image = image.crop((x1, y1, x2, y2))
+        offset = (roi[0], roi[1])
+
+    longest = max(image.size)
+    if longest > max_side:
+        factor = max_side / longest
+        image = image.resize((max(1, round(image.size[0] * factor)), max(1, round(image.size[1] * factor))),
+                             Image.BILINEAR)
+        scale *= factor
+    return image, offset, scale
+
+
+def to_frame_coords(detections: list, offset: Tuple[float, float], scale: float) -> list:
+    ox, oy = offset
+    for det in detections:
+        x1, y1, x2, y2 = det["bbox"]
+        det["bbox"] = [x1 / scale + ox, y1 / scale + oy, x2 / scale + ox, y2 / scale + oy]
+    return detections
+
+
+def expand_box(box: list, pad: float, width: int, height: int) -> list:
+    x1, y1, x2, y2 = box
+    pad_x, pad_y = (x2 - x1) * pad, (y2 - y1) * pad
+    return [max(0.0, x1 - pad_x), max(0.0, y1 - pad_y), min(float(width), x2 + pad_x), min(float(height), y2 + pad_y)]
+
+
+def iou(a: list, b: list) -> float:
+    ix = max(0.0, min(a[2], b[2]) - max(a[0], b[0]))
+    iy = max(0.0, min(a[3], b[3]) - max(a[1], b[1]))
+    inter = ix * iy
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union > 0 else 0.0
+
+
+def best_person_box(detections: list) -> Optional[list]:
+    people = [d for d in detections if d["class"] == "person"]
+    if not people:
+        return None
+    return max(people, key=lambda d: d["confidence"])["bbox"]
+
+
+def next_roi(detections: list, frame_size: Tuple[int, int], roi: Optional[list], person_box: Optional[list],
+             pad: float = PPEModelConfig.ROI_PAD, min_iou: float = PPEModelConfig.ROI_MIN_IOU):
+    """
+    Decide the crop for the next round. The current crop is kept while the person
+    stays put, re-centred once their box moves past `min_iou`, and dropped (back to
+    the full frame) when nobody was found.
+    """
+    found = best_person_box(detections)
+    if found is None:
+        return None, None
+    if roi is not None and person_box is not None and iou(found, person_box) >= min_iou:
+        return roi, person_box
+    return expand_box(found, pad, *frame_size), found
@@ -0,0 +1,168 @@
+import asyncio
+import math
+import time
+from collections import Counter, deque
+from contextlib import asynccontextmanager
+from typing import Dict, Optional
+from fastapi import HTTPException, status
+from backend.config import SchedulerConfig
+
+
+def parse_weights(spec: str) -> Dict[str, int]:
+    """"companyA:3,companyB:1" -> {"companyA": 3, "companyB": 1}"""
+    weights = {}
+    for part in filter(None, (p.strip() for p in spec.split(","))):
+        key, _, weight = part.rpartition(":")
+        if key and weight.isdigit():
+            weights[key] = max(1, int(weight))
+    return weights
+
+
+def stream_key(company_id: str, camera_id: Optional[str] = None, by: str = SchedulerConfig.KEY) -> str:
+    """Queue a request is scheduled on: one per camera, or one per company."""
+    if by == "camera" and camera_id:
+        return f"{company_id}:{camera_id}"
+    return company_id
+
+
+class QueueStats:
+    def __init__(self):
+        self.granted = 0
+        self.rejected = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.run_total = 0.0
+        self.run_max = 0.0
+
+    def as_dict(self, queued: int, in_flight: int) -> dict:
+        granted = self.granted or 1
+        return {
+            "queued": queued,
+            "in_flight": in_flight,
+            "granted": self.granted,
+            "rejected": self.rejected,
+            "wait_avg_ms": self.wait_total * 1000 / granted,
+            "wait_max_ms": self.wait_max * 1000,
+            "run_avg_ms": self.run_total * 1000 / granted,
+            "run_max_ms": self.run_max * 1000,
+        }
+
+
+class FairScheduler:
+    """
+    Admission control in front of the inference path. Each camera (or company)
+    gets its own FIFO queue; free slots are handed out round-robin across the
+    queues that have waiters, a queue with weight w getting up to w grants per
+    turn. At most `max_in_flight` callers run at once, and a queue that already
+    holds `max_queue` waiters sheds new requests with a 429 and a Retry-After hint.
+    """
+
+    def __init__(self, max_in_flight: int = SchedulerConfig.MAX_IN_FLIGHT,
+                 max_queue: int = SchedulerConfig.MAX_QUEUE, weights: Optional[Dict[str, int]] = None,
+                 retry_after: float = SchedulerConfig.RETRY_AFTER):
+        self.max_in_flight = max(1, max_in_flight)
+        self.max_queue = max(1, max_queue)
+        self.weights = weights if weights is not None else parse_weights(SchedulerConfig.WEIGHTS)
+        self.retry_after = retry_after
+        self._queues: Dict[str, deque] = {}
+        self._rotation = deque()
+        self._turn_grants = 0
+        self._in_flight = 0
+        self._running = Counter()
+        self._stats: Dict[str, QueueStats] = {}
+
+    def weight(self, key: str) -> int:
+        # a camera queue falls back to its company's weight
+        return self.weights.get(key) or self.weights.get(key.split(":", 1)[0], 1)
+
+    def _retry_hint(self, key: str) -> int:
+        stats = self._stats[key]
+        run_avg = stats.run_total / stats.granted if stats.granted else 0
+        estimate = run_avg * len(self._queues.get(key, ())) / self.weight(key)
+        return max(1, math.ceil(max(self.retry_after, estimate)))
+
+    async def acquire(self, key: str):
+        stats = self._stats.setdefault(key, QueueStats())
+        queue = self._queues.get(key)
+        if queue is not None and len(queue) >= self.max_queue:
+            stats.rejected += 1
+            raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                                detail="Too many frames queued for this camera, please retry shortly",
+                                headers={"Retry-After": str(self._retry_hint(key))})
+
+        if self._in_flight < self.max_in_flight and not self._rotation:
+            self._grant(key, 0.0)
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        if queue is None:
+            queue = self._queues[key] = deque()
+            self._rotation.append(key)
+        queue.append((future, time.perf_counter()))
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # the slot was granted just as the caller went away
+                self.release(key)
+            raise
+
+    def _grant(self, key: str, waited: float):
+        self._in_flight += 1
+        self._running[key] += 1
+        stats = self._stats[key]
+        stats.granted += 1
+        stats.wait_total += waited
+        stats.wait_max = max(stats.wait_max, waited)
+
+    def _dispatch(self):
+        while self._in_flight < self.max_in_flight and self._rotation:
+            key = self._rotation[0]
+            queue = self._queues[key]
+            future, queued = queue.popleft()
+            if not future.cancelled():
+                future.set_result(None)
+                self._grant(key, time.perf_counter() - queued)
+                self._turn_grants += 1
+
+            if not queue:
+                del self._queues[key]
+                self._rotation.popleft()
+                self._turn_grants = 0
+            elif self._turn_grants >= self.weight(key):
+                self._rotation.rotate(-1)
+                self._turn_grants = 0
+
+    def release(self, key: str, run_time: Optional[float] = None):
+        self._in_flight -= 1
+        self._running[key] -= 1
+        if not self._running[key]:
+            del self._running[key]
+        if run_time is not None:
+            stats = self._stats[key]
+            stats.run_total += run_time
+            stats.run_max = max(stats.run_max, run_time)
+        self._dispatch()
+
+    @asynccontextmanager
+    async def slot(self, key: str):
+        await self.acquire(key)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.release(key, time.perf_counter() - started)
+
+    def stats(self) -> dict:
+        return {
+            "max_in_flight": self.max_in_flight,
+            "max_queue": self.max_queue,
+            "in_flight": self._in_flight,
+            "queues": {
+                key: stats.as_dict(len(self._queues.get(key, ())), self._running.get(key, 0))
+                for key, stats in self._stats.items()
+            },
+        }
+
+
+gate_scheduler = FairScheduler()
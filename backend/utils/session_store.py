@@ -0,0 +1,226 @@
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Iterable, Optional
+from backend.config import SessionConfig
+
+COUNT_PREFIX = "count:"
+
+BOX_FIELDS = ("roi", "person_box")
+
+# Counts one round atomically: bail out if the session is gone, bump the per-class
+# counters and the round number, store any extra fields, refresh the TTL and
+# return the whole hash.
+# ARGV: ttl, now, number of counter fields, counter fields..., extra field/value pairs...
+RECORD_ROUND_LUA = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return nil
+end
+local n = tonumber(ARGV[3])
+for i = 4, 3 + n do
+    redis.call('HINCRBY', KEYS[1], ARGV[i], 1)
+end
+for i = 4 + n, #ARGV, 2 do
+    redis.call('HSET', KEYS[1], ARGV[i], ARGV[i + 1])
+end
+redis.call('HINCRBY', KEYS[1], 'rounds', 1)
+redis.call('HSET', KEYS[1], 'last_seen_time', ARGV[2])
+redis.call('EXPIRE', KEYS[1], ARGV[1])
+return redis.call('HGETALL', KEYS[1])
+"""
+
+CREATE_IF_ABSENT_LUA = """
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    return 0
+end
+redis.call('HSET', KEYS[1], unpack(ARGV, 2))
+redis.call('EXPIRE', KEYS[1], ARGV[1])
+return 1
+"""
+
+
+def session_key(session_id: str) -> str:
+    return f"session:{session_id}"
+
+
+def format_box(box) -> str:
+    return ",".join(f"{v:.1f}" for v in box) if box else ""
+
+
+def parse_box(value) -> Optional[list]:
+    return [float(v) for v in value.split(",")] if value else None
+
+
+def parse_session(fields: dict) -> dict:
+    counts = {k[len(COUNT_PREFIX):]: int(v) for k, v in fields.items() if k.startswith(COUNT_PREFIX)}
+    session = {
+        "person_id": fields.get("person_id"),
+        "rounds": int(fields.get("rounds", 0)),
+        "detections_count": counts,
+        "no_person_count": int(fields.get("no_person_count", 0)),
+        "last_seen_time": float(fields.get("last_seen_time", 0)),
+    }
+    for field in BOX_FIELDS:
+        session[field] = parse_box(fields.get(field))
+    return session
+
+
+class SessionStore(ABC):
+    """Interface shared by the session backends; `record_round` must be atomic per session."""
+
+    @abstractmethod
+    async def create(self, session_id: str, person_id: str, classes: Iterable[str], if_absent: bool = False) -> bool:
+        """Start a session; with `if_absent` an existing session is left untouched and False is returned."""
+
+    @abstractmethod
+    async def get(self, session_id: str) -> Optional[dict]:
+        ...
+
+    async def exists(self, session_id: str) -> bool:
+        return await self.get(session_id) is not None
+
+    @abstractmethod
+    async def record_round(self, session_id: str, detected_classes: Iterable[str],
+                           extra: Optional[dict] = None) -> Optional[dict]:
+        ...
+
+    @abstractmethod
+    async def delete(self, session_id: str) -> bool:
+        ...
+
+    async def close(self):
+        pass
+
+
+class RedisSessionStore(SessionStore):
+    """PPE check sessions kept as Redis hashes, one counter field per PPE class."""
+
+    def __init__(self, url: str = SessionConfig.REDIS_URL, ttl: int = SessionConfig.TTL):
+        import redis.asyncio as aioredis
+
+        self.ttl = ttl
+        self.redis = aioredis.from_url(url, decode_responses=True)
+        self._record_round = self.redis.register_script(RECORD_ROUND_LUA)
+        self._create_if_absent = self.redis.register_script(CREATE_IF_ABSENT_LUA)
+
+    async def create(self, session_id: str, person_id: str, classes: Iterable[str], if_absent: bool = False) -> bool:
+        key = session_key(session_id)
+        mapping = {
+            "person_id": person_id,
+            "rounds": 0,
+            "no_person_count": 0,
+            "last_seen_time": time.time(),
+            **{COUNT_PREFIX + cls: 0 for cls in classes},
+        }
+        if if_absent:
+            pairs = [v for item in mapping.items() for v in item]
+            return bool(await self._create_if_absent(keys=[key], args=[self.ttl, *pairs]))
+
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.hset(key, mapping=mapping)
+            pipe.expire(key, self.ttl)
+            await pipe.execute()
+        return True
+
+    async def get(self, session_id: str) -> Optional[dict]:
+        fields = await self.redis.hgetall(session_key(session_id))
+        return parse_session(fields) if fields else None
+
+    async def exists(self, session_id: str) -> bool:
+        return bool(await self.redis.exists(session_key(session_id)))
+
+    async def record_round(self, session_id: str, detected_classes: Iterable[str],
+                           extra: Optional[dict] = None) -> Optional[dict]:
+        fields = [COUNT_PREFIX + cls for cls in detected_classes]
+        pairs = [v for item in (extra or {}).items() for v in item]
+        raw = await self._record_round(keys=[session_key(session_id)],
+                                       args=[self.ttl, time.time(), len(fields), *fields, *pairs])
+        if raw is None:
+            return None
+        return parse_session(dict(zip(raw[::2], raw[1::2])))
+
+    async def delete(self, session_id: str) -> bool:
+        """Remove the session; only the caller that actually deleted it gets True."""
+        return bool(await self.redis.delete(session_key(session_id)))
+
+    async def close(self):
+        await self.redis.aclose()
+
+
+class MemorySessionStore(SessionStore):
+    """
+    In-process sessions for single-node deployments. Entries expire after `ttl`
+    seconds of inactivity and the least recently used session is evicted once
+    `max_sessions` is reached, so memory stays bounded. Methods never await
+    while mutating, which makes every operation atomic on the event loop.
+    """
+
+    def __init__(self, ttl: int = SessionConfig.TTL, max_sessions: int = SessionConfig.MAX_SESSIONS):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self._sessions = OrderedDict()  # session_id -> (expires_at, fields)
+        self.evicted = 0
+
+    def _get(self, session_id: str) -> Optional[dict]:
+        entry = self._sessions.get(session_id)
+        if entry is None:
+            return None
+        expires_at, fields = entry
+        if expires_at <= time.time():
+            del self._sessions[session_id]
+            return None
+        self._sessions.move_to_end(session_id)
+        return fields
+
+    def _purge_expired(self):
+        now = time.time()
+        expired = [sid for sid, (expires_at, _) in self._sessions.items() if expires_at <= now]
+        for sid in expired:
+            del self._sessions[sid]
+
+    async def create(self, session_id: str, person_id: str, classes: Iterable[str], if_absent: bool = False) -> bool:
+        if if_absent and self._get(session_id) is not None:
+            return False
+        if len(self._sessions) >= self.max_sessions:
+            self._purge_expired()
+        while len(self._sessions) >= self.max_sessions:
+            self._sessions.popitem(last=False)
+            self.evicted += 1
+
+        fields = {
+            "person_id": person_id,
+            "rounds": 0,
+            "no_person_count": 0,
+            "last_seen_time": time.time(),
+            **{COUNT_PREFIX + cls: 0 for cls in classes},
+        }
+        self._sessions[session_id] = (time.time() + self.ttl, fields)
+        return True
+
+    async def get(self, session_id: str) -> Optional[dict]:
+        fields = self._get(session_id)
+        return parse_session(fields) if fields is not None else None
+
+    async def record_round(self, session_id: str, detected_classes: Iterable[str],
+                           extra: Optional[dict] = None) -> Optional[dict]:
+        fields = self._get(session_id)
+        if fields is None:
+            return None
+        for cls in detected_classes:
+            fields[COUNT_PREFIX + cls] = fields.get(COUNT_PREFIX + cls, 0) + 1
+        fields.update(extra or {})
+        fields["rounds"] += 1
+        fields["last_seen_time"] = time.time()
+        self._sessions[session_id] = (time.time() + self.ttl, fields)
+        return parse_session(fields)
+
+    async def delete(self, session_id: str) -> bool:
+        return self._sessions.pop(session_id, None) is not None
+
+
+def create_session_store(backend: str = SessionConfig.BACKEND) -> SessionStore:
+    if backend == "memory":
+        return MemorySessionStore()
+    if backend == "redis":
+        return RedisSessionStore()
+    raise ValueError(f"Unknown session backend: {backend}")
@@ -0,0 +1,62 @@
+from collections import defaultdict
+from backend.config import SessionConfig
+
+
+class MemoryVersions:
+    """Invalidation versions for a single process."""
+
+    name = "memory"
+
+    def __init__(self, namespace: str = ""):
+        self._generation = 0
+        self._companies = defaultdict(int)
+
+    async def current(self, company_id: str) -> tuple:
+        return self._generation, self._companies[company_id]
+
+    async def bump(self, company_id: str):
+        self._companies[company_id] += 1
+
+    async def bump_all(self):
+        self._generation += 1
+
+    async def close(self):
+        pass
+
+
+class RedisVersions:
+    """
+    Invalidation versions shared by every worker: one INCR counter per company
+    plus a global generation for clear(). A cached entry is only served while
+    both still match, so a write on any worker invalidates all of them.
+    """
+
+    name = "redis"
+
+    def __init__(self, namespace: str, url: str = SessionConfig.REDIS_URL):
+        import redis.asyncio as aioredis
+
+        self.prefix = f"{namespace}:version:"
+        self.generation_key = f"{namespace}:generation"
+        self.redis = aioredis.from_url(url, decode_responses=True)
+
+    async def current(self, company_id: str) -> tuple:
+        generation, version = await self.redis.mget(self.generation_key, self.prefix + company_id)
+        return int(generation or 0), int(version or 0)
+
+    async def bump(self, company_id: str):
+        await self.redis.incr(self.prefix + company_id)
+
+    async def bump_all(self):
+        await self.redis.incr(self.generation_key)
+
+    async def close(self):
+        await self.redis.aclose()
+
+
+def create_versions(backend: str, namespace: str):
+    if backend == "memory":
+        return MemoryVersions(namespace)
+    if backend == "redis":
+        return RedisVersions(namespace)
+    raise ValueError(f"Unknown {namespace} versions backend: {backend}")
@@ -0,0 +1,137 @@
+from typing import Iterable, Iterator, List, Optional, Tuple
+from PIL import Image
+from backend.config import AuditConfig
+
+AUDIT_ITEMS = ("helmet", "gloves", "vest", "goggles", "ear protection")
+DEFAULT_FPS = 25.0
+
+
+# ----------------------------
+# Frame source
+# ----------------------------
+def iter_video_frames(path: str, sample_fps: float = AuditConfig.SAMPLE_FPS) -> Iterator[Tuple[float, Image.Image]]:
+    """
+    Yield (timestamp_sec, RGB image) for roughly `sample_fps` frames per second of
+    video. Skipped frames are only grabbed, not decoded, and nothing is buffered,
+    so memory stays flat regardless of the video length.
+    """
+    import cv2
+
+    capture = cv2.VideoCapture(path)
+    if not capture.isOpened():
+        raise ValueError(f"Cannot open video: {path}")
+    try:
+        fps = capture.get(cv2.CAP_PROP_FPS) or DEFAULT_FPS
+        step = max(1, round(fps / sample_fps)) if sample_fps > 0 else 1
+        index = 0
+        while capture.grab():
+            if index % step == 0:
+                ok, frame = capture.retrieve()
+                if ok:
+                    yield index / fps, Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+            index += 1
+    finally:
+        capture.release()
+
+
+def batched(items: Iterable, size: int) -> Iterator[list]:
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+# ----------------------------
+# Per-window aggregation
+# ----------------------------
+class WindowAggregator:
+    """
+    Folds (timestamp, detections) pairs into fixed `window_sec` windows. A frame
+    counts towards compliance only if a person is in view; it is compliant when
+    every AUDIT_ITEMS class is detected in it.
+    """
+
+    def __init__(self, window_sec: float = AuditConfig.WINDOW_SEC):
+        self.window_sec = window_sec
+        self._index = None
+        self._reset()
+
+    def _reset(self):
+        self.frames = 0
+        self.person_frames = 0
+        self.compliant_frames = 0
+        self.item_frames = {item: 0 for item in AUDIT_ITEMS}
+
+    def add(self, timestamp: float, detections: list) -> Optional[dict]:
+        """Add one frame; returns the previous window once a frame lands past it."""
+        index = int(timestamp // self.window_sec)
+        closed = None
+        if self._index is not None and index != self._index:
+            closed = self._summary()
+            self._reset()
+        self._index = index
+
+        self.frames += 1
+        classes = {d["class"] for d in detections}
+        if "person" in classes:
+            self.person_frames += 1
+            for item in AUDIT_ITEMS:
+                self.item_frames[item] += item in classes
+            self.compliant_frames += all(item in classes for item in AUDIT_ITEMS)
+        return closed
+
+    def close(self) -> Optional[dict]:
+        if self._index is None or not self.frames:
+            return None
+        summary = self._summary()
+        self._reset()
+        return summary
+
+    def _summary(self) -> dict:
+        people = self.person_frames
+        return {
+            "window_start": self._index * self.window_sec,
+            "window_end": (self._index + 1) * self.window_sec,
+            "frames": self.frames,
+            "person_frames": people,
+            "compliant_frames": self.compliant_frames,
+            "compliance_rate": self.compliant_frames / people if people else None,
+            "item_frames": dict(self.item_frames),
+            "missing_rate": {item: 1 - n / people for item, n in self.item_frames.items()} if people else {},
+        }
+
+
+def summarize(windows: List[dict]) -> dict:
+    people = sum(w["person_frames"] for w in windows)
+    compliant = sum(w["compliant_frames"] for w in windows)
+    return {
+        "windows": len(windows),
+        "frames": sum(w["frames"] for w in windows),
+        "person_frames": people,
+        "compliant_frames": compliant,
+        "compliance_rate": compliant / people if people else None,
+    }
+
+
+# ----------------------------
+# In-process pipeline (CLI)
+# ----------------------------
+def audit_video(path: str, sample_fps: float = AuditConfig.SAMPLE_FPS, window_sec: float = AuditConfig.WINDOW_SEC,
+                batch_size: int = AuditConfig.BATCH, detect=None) -> Iterator[dict]:
+    """Stream per-window compliance aggregates for a video file."""
+    if detect is None:
+        from backend.utils.vision import detect_ppe_batch as detect
+
+    aggregator = WindowAggregator(window_sec)
+    for batch in batched(iter_video_frames(path, sample_fps), batch_size):
+        for (timestamp, _), detections in zip(batch, detect([image for _, image in batch])):
+            window = aggregator.add(timestamp, detections)
+            if window is not None:
+                yield window
+    window = aggregator.close()
+    if window is not None:
+        yield window
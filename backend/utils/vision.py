@@ -0,0 +1,92 @@
+import threading
+import time
+from backend.config import PPEModelConfig
+from backend.utils.ppe_model import load_ppe_model
+from backend.utils.preprocess import prepare_frame, to_frame_coords
+
+# ultralytics predictors are not thread safe, so each worker thread (or process) gets its own model
+_local = threading.local()
+
+
+def get_ppe_model():
+    model = getattr(_local, "ppe_model", None)
+    if model is None:
+        model = load_ppe_model()
+        _local.ppe_model = model
+    return model
+
+
+# ----------------------------
+# Model calls run inside the inference executor; they return plain data so
+# results can cross a process boundary.
+# ----------------------------
+def represent_face(img_path: str, **kwargs) -> list:
+    from deepface import DeepFace
+    return DeepFace.represent(img_path=img_path, **kwargs)
+
+
+def load_rgb(image):
+    """Decode a lazily opened frame once so several models can share it."""
+    return image.convert("RGB")
+
+
+def represent_face_image(image, **kwargs) -> list:
+    import numpy as np
+    from deepface import DeepFace
+    # DeepFace takes OpenCV-style BGR arrays
+    return DeepFace.represent(img_path=np.asarray(image)[:, :, ::-1], **kwargs)
+
+
+def _format_boxes(model, boxes) -> list:
+    return [
+        {
+            "class": model.names[int(b.cls)],
+            "confidence": float(b.conf),
+            "bbox": b.xyxy[0].tolist(),
+        }
+        for b in boxes
+    ]
+
+
+def detect_ppe(image, conf: float = PPEModelConfig.CONF) -> list:
+    model = get_ppe_model()
+    return _format_boxes(model, model(image, conf=conf)[0].boxes)
+
+
+def detect_ppe_batch(images: list, conf: float = PPEModelConfig.CONF) -> list:
+    model = get_ppe_model()
+    return [_format_boxes(model, result.boxes) for result in model(images, conf=conf)]
+
+
+def detect_ppe_frames(frames: list, conf: float = PPEModelConfig.CONF) -> list:
+    """Batched detection on (image, roi) pairs; boxes come back in full-frame coordinates."""
+    model = get_ppe_model()
+    prepared = [prepare_frame(image, roi) for image, roi in frames]
+    results = model([image for image, _, _ in prepared], conf=conf)
+    return [
+        to_frame_coords(_format_boxes(model, result.boxes), offset, scale)
+        for result, (_, offset, scale) in zip(results, prepared)
+    ]
+
+
+def warm_up_models(barrier=None) -> dict:
+    """
+    Load both models in the calling worker and push one dummy frame through each,
+    so the first real request doesn't pay for weight loading or graph setup.
+    `barrier` holds each thread until all workers got a warm-up call.
+    """
+    import numpy as np
+    from PIL import Image
+
+    timings = {}
+    started = time.time()
+    detect_ppe(Image.new("RGB", (PPEModelConfig.MAX_SIDE, PPEModelConfig.MAX_SIDE)))
+    timings["ppe_model"] = time.time() - started
+
+    started = time.time()
+    represent_face_image(Image.new("RGB", (224, 224)), enforce_detection=False)
+    timings["face_model"] = time.time() - started
+
+    if barrier is not None:
+        barrier.wait()
+    return timings
@@ -0,0 +1,65 @@
+import asyncio
+import threading
+import time
+from backend.config import WarmupConfig
+from backend.utils.inference import inference_executor
+
+
+class ModelWarmup:
+    """
+    Controlled model start-up. The app serves auth, admin and dashboard routes
+    immediately; models are loaded in the background and /health/ready reports
+    503 until every inference worker has run a dummy frame.
+    """
+
+    def __init__(self, executor=inference_executor, enabled: bool = WarmupConfig.ENABLED,
+                 timeout: float = WarmupConfig.TIMEOUT):
+        self.executor = executor
+        self.enabled = enabled
+        self.timeout = timeout
+        self.status = "pending" if enabled else "skipped"
+        self.error = None
+        self.workers = []
+        self.started_at = None
+        self.duration = None
+        self._task = None
+
+    @property
+    def ready(self) -> bool:
+        return self.status in ("ready", "skipped")
+
+    def start(self):
+        if self.enabled and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        from backend.utils.vision import warm_up_models
+
+        self.status = "warming"
+        self.started_at = time.time()
+        workers = self.executor.workers
+        # thread workers keep a model per thread, so hold each one until all are loaded
+        barrier = threading.Barrier(workers, timeout=self.timeout) if self.executor.mode == "thread" else None
+        try:
+            self.workers = await asyncio.gather(*(
+                self.executor.run(warm_up_models, barrier, timeout=self.timeout) for _ in range(workers)
+            ))
+            self.status = "ready"
+        except Exception as e:
+            self.status = "failed"
+            self.error = str(e) or type(e).__name__
+            print(f"[Warmup] Model warm-up failed: {self.error}")
+        self.duration = time.time() - self.started_at
+        print(f"[Warmup] {self.status} after {self.duration:.1f}s")
+
+    def report(self) -> dict:
+        return {
+            "status": self.status,
+            "ready": self.ready,
+            "duration": self.duration,
+            "workers": self.workers,
+            "error": self.error,
+        }
+
+
+model_warmup = ModelWarmup()
@@ -0,0 +1,156 @@
+import asyncio
+import inspect
+import time
+from collections import Counter
+
+
+class BatchedWriter:
+    """
+    In-process write-behind queue. Callers enqueue pymongo write operations
+    (InsertOne / UpdateOne ...) for a collection; a single background task
+    drains them in batches of up to `max_batch` or every `max_wait_ms`, one
+    unordered bulk_write per collection.
+
+    The queue holds at most `max_queue` operations; once full, `write` waits for
+    room, which pushes back on the request path instead of growing memory.
+
+    `if_upserted` attaches follow-up (collection, op[, if_upserted]) writes to an
+    upsert; they are written in the same flush, only if the upsert actually
+    inserted, and may carry follow-ups of their own.
+    `on_written` (a function or coroutine function) is called once the flush
+    holding the ops has completed.
+    """
+
+    def __init__(self, max_batch: int, max_wait_ms: float, max_queue: int):
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max_wait_ms / 1000
+        self.max_queue = max(1, max_queue)
+        self._queue = None
+        self._worker = None
+        self._batch_sizes = Counter()
+        self._written = 0
+        self._failed = 0
+        self._backpressure_waits = 0
+        self._enqueue_wait_total = 0.0
+        self._max_depth = 0
+
+    def _ensure_worker(self):
+        if self._queue is None:
+            self._queue = asyncio.Queue(self.max_queue)
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._drain())
+
+    async def write(self, collection, *ops, if_upserted=None, on_written=None):
+        self._ensure_worker()
+        for i, op in enumerate(ops):
+            last = i == len(ops) - 1
+            item = (collection, op, if_upserted if last else None, on_written if last else None)
+            if self._queue.full():
+                self._backpressure_waits += 1
+                start = time.perf_counter()
+                await self._queue.put(item)
+                self._enqueue_wait_total += time.perf_counter() - start
+            else:
+                self._queue.put_nowait(item)
+        self._max_depth = max(self._max_depth, self._queue.qsize())
+
+    async def _drain(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            try:
+                await self._flush(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _flush(self, batch):
+        self._batch_sizes[len(batch)] += 1
+        try:
+            items = batch
+            while items:
+                items = await self._bulk_write(items)
+        finally:
+            for *_, on_written in batch:
+                if on_written is None:
+                    continue
+                # a failing callback must not take the drain worker down with it
+                try:
+                    result = on_written()
+                    if inspect.isawaitable(result):
+                        await result
+                except Exception as e:
+                    print(f"[Writer] on_written callback failed: {e}")
+
+    async def _bulk_write(self, items) -> list:
+        """One unordered bulk_write per collection; returns the follow-ups of upserts that inserted."""
+        grouped = {}
+        for collection, op, if_upserted, _ in items:
+            group = grouped.setdefault(collection.name, (collection, [], []))
+            group[1].append(op)
+            group[2].append(if_upserted)
+
+        results = await asyncio.gather(
+            *(collection.bulk_write(ops, ordered=False) for collection, ops, _ in grouped.values()),
+            return_exceptions=True
+        )
+        follow_ups = []
+        for (collection, ops, extras), result in zip(grouped.values(), results):
+            if isinstance(result, Exception):
+                # unordered bulk writes still apply every op that didn't fail
+                details = getattr(result, "details", None) or {}
+                failed = len(details.get("writeErrors", [])) or len(ops)
+                upserted = [u["index"] for u in details.get("upserted", [])]
+                self._failed += failed
+                self._written += len(ops) - failed
+                print(f"[Writer] bulk_write to {collection.name} failed for {failed}/{len(ops)} ops: {result}")
+            else:
+                upserted = list(result.upserted_ids)
+                self._written += len(ops)
+            for index in upserted:
+                for follow_collection, follow_op, *nested in extras[index] or ():
+                    follow_ups.append((follow_collection, follow_op, nested[0] if nested else None, None))
+        return follow_ups
+
+    async def flush(self):
+        """Wait until everything queued so far has been written."""
+        if self._queue is not None:
+            await self._queue.join()
+
+    async def close(self):
+        await self.flush()
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+
+    def stats(self) -> dict:
+        batches = sum(self._batch_sizes.values())
+        ops = sum(size * count for size, count in self._batch_sizes.items())
+        return {
+            "max_batch": self.max_batch,
+            "max_wait_ms": self.max_wait * 1000,
+            "max_queue": self.max_queue,
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "max_queue_depth": self._max_depth,
+            "batches": batches,
+            "avg_batch_size": ops / batches if batches else 0,
+            "written": self._written,
+            "failed": self._failed,
+            "backpressure_waits": self._backpressure_waits,
+            "avg_backpressure_wait_ms": (self._enqueue_wait_total * 1000 / self._backpressure_waits
+                                         if self._backpressure_waits else 0),
+            "batch_size_histogram": dict(sorted(self._batch_sizes.items())),
+        }